@@ -1,115 +1,562 @@
+import asyncio
+import inspect
 import json
-from openai import OpenAI
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from types import SimpleNamespace
+from Agents.ResponseCache import ResponseCache
+from Agents.TranscriptManager import TranscriptManager
+from metrics import MetricsRecorder, cached_prompt_tokens
+from environment_state import EnvironmentState
+from model_backends import model_router
+from resilience import model_guard
+from rate_limit import ConcurrencyLimit
+from workspace import submit_in_context
+
+class ToolArgumentsError(ValueError):
+    """The model produced tool-call arguments that are not a JSON object."""
+
 
 class BaseAgent:
-    def __init__(self, tools, api_key, workdir, topic):
+    def __init__(self, tools, api_key, workdir, topic, parallel_tools=False, max_tool_workers=4,
+                 model_timeout=None, tool_timeout=None, stream=False, on_token=None,
+                 context_budget=48000, metrics=None, llm_cache="passthrough", llm_cache_dir=None,
+                 environment=None, state=None, llm_limit=None, route=None):
         self.topic = topic
         self.tools_meta_map = tools
         self.tools_meta = [v["meta"] for v in tools.values()]
         self.tool_func_map = {k: v["func"] for k, v in tools.items()}
+        self.tool_parallel_safe = {k: v.get("parallel_safe", False) for k, v in tools.items()}
         self.workdir = workdir
 
+        # 同一轮中的多个可并行工具调用是否并发执行
+        self.parallel_tools = parallel_tools
+        self.max_tool_workers = max_tool_workers
+
+        # 模型请求与单个工具调用的超时（秒），None 表示不限制
+        self.model_timeout = model_timeout
+        self.tool_timeout = tool_timeout
+
+        # 流式输出：模型生成的文本片段实时交给 on_token（默认打印到终端）
+        self.stream = stream
+        self.on_token = on_token or (lambda text: print(text, end="", flush=True))
+
         # 历史对话缓存 [(role, content), ...]
         self.history = []
         self.max_hist_len = 15
         self.step_number = 0
+
+        # 单次 run() 内的上下文（含工具结果）按 token 预算压缩
+        self.transcript = TranscriptManager(max_tokens=context_budget)
+        self.last_prompt_stats: dict = {}
+
+        # 耗时与 token 统计；iteration 由 workflow 在每轮开始时设置
+        self.metrics = metrics or MetricsRecorder()
+        self.agent_name = type(self).__name__
+        self.iteration = None
+
+        # 共享的目录状态服务（按目录 mtime 缓存列表，并给出各 Agent 的增量）
+        self.environment = environment or EnvironmentState(workdir)
+        # 工作流共享状态（检索请求、评分等），由 workflow 传入
+        self.shared_state = state
+        # 全局 LLM 并发上限（批量模式下由所有任务共享），默认不限制
+        self.llm_limit = llm_limit or ConcurrencyLimit()
         self.state: dict[str, str] = self.perceive_environment()
 
-        base_url = "https://api.deepseek.com"
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        # 模型响应缓存：passthrough / record / replay
+        self.response_cache = ResponseCache(
+            llm_cache_dir or os.path.join(workdir, ".cache", "llm"), mode=llm_cache
+        )
+
+        # 本角色使用的模型端点（主端点在前，之后为备用端点），客户端共享同一个连接池
+        self.route = route or model_router.route(self.agent_name, api_key)
 
     def _build_prompt(self, user_input: str = "") -> list:
-        """构建对话上下文（包含角色说明、历史记录、当前输入）"""
+        """
+        构建对话上下文（角色说明、历史记录、当前输入）。
+        不变的部分（角色、背景、示例）放在最前面，历史记录其次，随环境变化的状态
+        只放在最后一条消息中，使提示词前缀在各步、各轮之间保持一致，
+        可以命中服务端的上下文缓存。
+        """
         context_text = self.context()
         role_desc_text = self.role_description()
         example_cmd_text = self.example_command()
         state_text = json.dumps(self.state, ensure_ascii=False, indent=2)
 
-        # 基础系统提示
+        # 基础系统提示（只包含静态内容）
         system_msg = {
             "role": "system",
             "content": (
                 f"{role_desc_text}\n\n"
-                f"### Current status:\n{state_text}\n\n"
                 f"Always act and respond consistently with this role, "
                 f"even when the user asks about your identity.\n\n"
                 f"### Context:\n{context_text}\n\n"
                 f"### Example Command:\n{example_cmd_text}\n\n"
+                f"The latest message starts with the current status of your working directory.\n\n"
             ),
         }
 
         # 保留最近 max_hist_len 轮历史记录（裁剪旧的）
         trimmed_history = self.history[-self.max_hist_len:]
 
-        # 组装消息序列
+        # 组装消息序列；当前状态与本轮输入合并为最后一条 user 消息
+        # （部分模型不接受连续两条 user 消息）
         messages = [system_msg] + [
             {"role": role, "content": content} for role, content in trimmed_history
         ]
-        messages.append({"role": "user", "content": user_input})
+        messages.append({"role": "user", "content": f"### Current status:\n{state_text}\n\n{user_input}"})
+        # 状态已经写入提示词，之后的变化相对这次快照计算
+        self.environment.mark_seen(self.agent_name)
 
         return messages
 
-    def run(self, user_input: str = "") -> str:
+    def _start_run(self, user_input: str) -> list:
         self.state = self.perceive_environment()
         messages = self._build_prompt(user_input)
         print("消息提示词", messages)
         self.history.append(("user", user_input))
+        return messages
+
+    def _compact_messages(self, messages: list) -> None:
+        # 控制上下文长度并记录每一步的提示词规模
+        stats = self.transcript.compact(messages)
+        self.last_prompt_stats = {"step": self.step_number, **stats}
+        self._record("prompt", **stats)
+        print(f"上下文：约 {stats['prompt_tokens']} tokens，{stats['messages']} 条消息，"
+              f"本步省略 {stats['elided']} 条旧工具输出")
+
+    def _record(self, kind: str, **fields) -> None:
+        self.metrics.record(kind, self.agent_name, self.iteration, step=self.step_number, **fields)
+
+    def _record_model_call(self, latency: float, usage, **fields) -> None:
+        self._record(
+            "model_call",
+            latency=latency,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            cached_tokens=cached_prompt_tokens(usage),
+            **fields,
+        )
+
+    def _create_kwargs(self, messages: list) -> dict:
+        return dict(
+            model=self.route.primary.model,
+            messages=messages,
+            tools=self.tools_meta,
+            tool_choice="auto",
+            stream=False,
+        )
+
+    def _print_step(self, content) -> None:
+        # ✅ 打印模型输出与 step_number
+        print(f"\n=== Step {self.step_number} ===")
+        print(f"模型输出内容：\n{content if content else '(无文本内容)'}")
+
+    def _finish_run(self, content) -> str:
+        self.history.append(("assistant", content))
+        self.history = self.history[-self.max_hist_len:]
+        print(f"=== 对话结束 (Step {self.step_number}) ===\n")
+        return content
+
+    @staticmethod
+    def _tool_call_dict(tool_call) -> dict:
+        return {
+            "id": tool_call.id,
+            "type": "function",
+            "function": {
+                "name": tool_call.function.name,
+                "arguments": tool_call.function.arguments,
+            },
+        }
+
+    def _append_tool_results(self, messages: list, tool_calls, tool_results) -> None:
+        for tool_call, tool_result in zip(tool_calls, tool_results):
+            # 把工具调用及结果追加进上下文
+            messages += [
+                {"role": "assistant", "tool_calls": [self._tool_call_dict(tool_call)]},
+                {"role": "tool", "tool_call_id": tool_call.id, "content": str(tool_result)},
+            ]
+
+    def run(self, user_input: str = "") -> str:
+        messages = self._start_run(user_input)
 
         while True:
             # 步骤计数 +1
             self.step_number += 1
+            step_start = time.perf_counter()
             self.state = self.perceive_environment()
+            self._compact_messages(messages)
+
+            # replay 模式下直接使用缓存的完整响应，不走流式请求
+            if self.stream and self.response_cache.mode != "replay":
+                # 流式输出，工具参数一旦完整即开始执行
+                content, tool_calls, tool_results = self._stream_step(messages)
+                if not tool_calls:
+                    self._record("step", wall_time=time.perf_counter() - step_start)
+                    return self._finish_run(content)
+            else:
+                # 调用模型
+                model_start = time.perf_counter()
+                response = self._create_completion(self._create_kwargs(messages))
+                self._record_model_call(time.perf_counter() - model_start, response.usage,
+                                        cached=self.response_cache.mode == "replay")
+                ai_message = response.choices[0].message
+                content, tool_calls = ai_message.content, ai_message.tool_calls
+
+                self._print_step(content)
+                # 如果没有工具调用，返回结果
+                if not tool_calls:
+                    self._record("step", wall_time=time.perf_counter() - step_start)
+                    return self._finish_run(content)
+
+                # 执行工具调用，结果按原 tool_call 顺序追加
+                tool_results = self._dispatch_tool_calls(tool_calls)
+
+            self._append_tool_results(messages, tool_calls, tool_results)
+            self._record("step", wall_time=time.perf_counter() - step_start)
+
+    def _request_options(self) -> dict:
+        # 未设置 model_timeout 时使用连接池的默认超时（显式传 None 会关闭超时）
+        return {"timeout": self.model_timeout} if self.model_timeout is not None else {}
+
+    def _request_completion(self, endpoint, kwargs: dict):
+        # 备用端点使用自己的模型名
+        return endpoint.client.chat.completions.create(**{**kwargs, "model": endpoint.model},
+                                                       **self._request_options())
+
+    def _open_stream(self, endpoint, kwargs: dict):
+        # 连同端点一起返回，读取中途出错时记在该端点上
+        return endpoint, self._request_completion(endpoint, kwargs)
+
+    async def _arequest_completion(self, endpoint, kwargs: dict):
+        return await endpoint.async_client.chat.completions.create(**{**kwargs, "model": endpoint.model})
+
+    def _create_completion(self, kwargs: dict):
+        if self.response_cache.mode == "replay":
+            return self.response_cache.replay(kwargs)
+        # 超时、限流与服务端错误按退避策略重试，端点不可用或过慢时切换到备用端点
+        # 每次尝试单独占用全局并发名额，退避等待期间不占用
+        response = self.route.call(self._request_completion, kwargs, limit=self.llm_limit)
+        if self.response_cache.mode == "record":
+            self.response_cache.record(kwargs, response)
+        return response
+
+    async def _acreate_completion(self, kwargs: dict):
+        if self.response_cache.mode == "replay":
+            return self.response_cache.replay(kwargs)
+        response = await self.route.acall(self._arequest_completion, kwargs, limit=self.llm_limit,
+                                          timeout=self.model_timeout)
+        if self.response_cache.mode == "record":
+            self.response_cache.record(kwargs, response)
+        return response
+
+    def _stream_step(self, messages: list):
+        """
+        Run one model step with stream=True. Content deltas go to on_token as they
+        arrive. Tool-call deltas are assembled by index, and each tool call is
+        submitted as soon as its arguments are complete, i.e. when the next tool
+        call starts or the stream ends. Ordering follows _tool_call_groups: a
+        parallel-safe call only waits for the last barrier, any other call waits
+        for every earlier call.
+        Opening the stream is retried by the route like any request. If the
+        stream breaks off later, tool calls that already started are kept and
+        end the step; if none had started, the step is redone as a
+        non-streaming request.
+        Returns (content, tool_calls, tool_results).
+        """
+        kwargs = self._create_kwargs(messages)
+        kwargs["stream"] = True
+        kwargs["stream_options"] = {"include_usage": True}
+
+        print(f"\n=== Step {self.step_number} ===")
+        print("模型输出内容：")
+
+        content_parts = []
+        partial = {}  # index -> {"id", "name", "arguments"}
+        tool_calls, futures = [], []
+        barrier = None
 
-            # 调用模型
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=messages,
-                tools=self.tools_meta,
-                tool_choice="auto",
-                stream=False,
+        def launch(index):
+            nonlocal barrier
+            if content_parts and not tool_calls:
+                print()
+            entry = partial.pop(index)
+            tool_call = SimpleNamespace(
+                id=entry["id"],
+                type="function",
+                function=SimpleNamespace(name=entry["name"], arguments=entry["arguments"] or "{}"),
             )
+            safe = self.parallel_tools and self.tool_parallel_safe.get(tool_call.function.name, False)
+            deps = ([barrier] if barrier else []) if safe else list(futures)
+            future = submit_in_context(pool, self._execute_after, deps, tool_call)
+            if not safe:
+                barrier = future
+            tool_calls.append(tool_call)
+            futures.append(future)
 
-            ai_message = response.choices[0].message
-            content = ai_message.content
-            tool_calls = ai_message.tool_calls
+        usage, first_token, stream_error = None, None, None
+        model_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_tool_workers) as pool:
+            # 流式请求在整个接收过程中占用一个全局 LLM 并发名额
+            with self.llm_limit:
+                endpoint, stream = self.route.call(self._open_stream, kwargs)
+                try:
+                    for chunk in stream:
+                        # 开启 include_usage 后，最后一个 chunk 只携带 usage
+                        usage = getattr(chunk, "usage", None) or usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        if first_token is None:
+                            first_token = time.perf_counter() - model_start
+
+                        if delta.content:
+                            content_parts.append(delta.content)
+                            self.on_token(delta.content)
+
+                        for tc_delta in delta.tool_calls or []:
+                            # 出现新的 index，说明之前的工具调用参数已经完整
+                            for index in sorted(k for k in partial if k < tc_delta.index):
+                                launch(index)
+                            entry = partial.setdefault(tc_delta.index, {"id": None, "name": "", "arguments": ""})
+                            if tc_delta.id:
+                                entry["id"] = tc_delta.id
+                            if tc_delta.function:
+                                entry["name"] += tc_delta.function.name or ""
+                                entry["arguments"] += tc_delta.function.arguments or ""
+                except Exception as e:
+                    # 读取中途断开或超时：guard 只重试了建立连接，这里单独补救
+                    endpoint.guard.count("stream_errors")
+                    stream_error = e
+
+            if stream_error is not None:
+                print(f"\n流式输出中断（{type(stream_error).__name__}: {stream_error}）")
+                if tool_calls:
+                    # 已开始执行的工具无法撤回：本步以已完整的工具调用结束，未接收完的丢弃
+                    print("保留已开始执行的工具调用，未接收完整的部分丢弃")
+                    partial.clear()
+                else:
+                    print("改用非流式请求重新生成本步：")
+                    request = {k: v for k, v in kwargs.items() if k != "stream_options"}
+                    response = self.route.call(self._request_completion, {**request, "stream": False},
+                                               limit=self.llm_limit)
+                    message = response.choices[0].message
+                    usage = response.usage
+                    content_parts[:] = [message.content] if message.content else []
+                    if message.content:
+                        self.on_token(message.content)
+                    partial.clear()
+                    for index, tool_call in enumerate(message.tool_calls or []):
+                        partial[index] = {"id": tool_call.id, "name": tool_call.function.name,
+                                          "arguments": tool_call.function.arguments}
+
+            for index in sorted(partial):
+                launch(index)
+            self._record_model_call(time.perf_counter() - model_start, usage, first_token=first_token)
+
+            content = "".join(content_parts) or None
+            if self.response_cache.mode == "record":
+                self.response_cache.record(kwargs, self._streamed_completion(kwargs, content, tool_calls, usage))
+            if not content:
+                print("(无文本内容)")
+            print()
+
+            tool_results = [future.result() for future in futures]
+
+        return content, tool_calls, tool_results
+
+    def _streamed_completion(self, kwargs: dict, content, tool_calls, usage) -> dict:
+        """把流式结果还原成与非流式响应相同结构的 dict，供响应缓存记录"""
+        return {
+            "id": f"stream-{self.step_number}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": kwargs["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls" if tool_calls else "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": content,
+                    "tool_calls": [self._tool_call_dict(tc) for tc in tool_calls] or None,
+                },
+            }],
+            "usage": usage.model_dump() if hasattr(usage, "model_dump") else None,
+        }
+
+    def _execute_after(self, deps, tool_call) -> str:
+        wait(deps)
+        return self._execute_tool_call(tool_call)
+
+    async def arun(self, user_input: str = "") -> str:
+        """
+        Async counterpart of run() built on AsyncOpenAI (always non-streaming).
+        Every model request attempt is bounded by model_timeout and every tool
+        call by tool_timeout; cancelling the task cancels the in-flight request
+        or tool wait.
+        """
+        messages = self._start_run(user_input)
+
+        while True:
+            self.step_number += 1
+            step_start = time.perf_counter()
+            self.state = self.perceive_environment()
+            self._compact_messages(messages)
+
+            model_start = time.perf_counter()
+            response = await self._acreate_completion(self._create_kwargs(messages))
+            self._record_model_call(time.perf_counter() - model_start, response.usage,
+                                    cached=self.response_cache.mode == "replay")
 
-            # ✅ 打印模型输出与 step_number
-            print(f"\n=== Step {self.step_number} ===")
-            print(f"模型输出内容：\n{content if content else '(无文本内容)'}")
+            ai_message = response.choices[0].message
+            content, tool_calls = ai_message.content, ai_message.tool_calls
 
-            # 如果没有工具调用，返回结果
+            self._print_step(content)
             if not tool_calls:
-                self.history.append(("assistant", content))
-                self.history = self.history[-self.max_hist_len:]
-                print(f"=== 对话结束 (Step {self.step_number}) ===\n")
-                return content
-
-            # 如果有多个工具调用，可以逐个处理
-            for tool_call in tool_calls:
-                tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
-                args_str = json.dumps(tool_args, ensure_ascii=False)
-
-                # 限制参数输出长度
-                max_len = 200
-                if len(args_str) > max_len:
-                    args_str = args_str[:max_len] + "..."
-
-                print(f"工具调用：{tool_name}，参数：{args_str}")
-
-                tool_func = self.tool_func_map.get(tool_name)
-                tool_result = (
-                    tool_func(**tool_args) if tool_func else f"Unknown tool: {tool_name}"
-                )
-                print("工具调用结果：", str(tool_result)[:200] + "...")
-
-                # 把工具调用及结果追加进上下文
-                messages += [
-                    {"role": "assistant", "tool_calls": [tool_call]},
-                    {"role": "tool", "tool_call_id": tool_call.id, "content": str(tool_result)},
-                ]
-
-        
+                self._record("step", wall_time=time.perf_counter() - step_start)
+                return self._finish_run(content)
+
+            tool_results = await self._adispatch_tool_calls(tool_calls)
+            self._append_tool_results(messages, tool_calls, tool_results)
+            self._record("step", wall_time=time.perf_counter() - step_start)
+
+    def _prepare_tool_call(self, tool_call):
+        tool_name = tool_call.function.name
+        try:
+            tool_args = json.loads(tool_call.function.arguments or "{}")
+        except json.JSONDecodeError as e:
+            model_guard.count("bad_tool_arguments")
+            raise ToolArgumentsError(
+                f"Error: the arguments of {tool_name} are not valid JSON ({e.msg} at position {e.pos}). "
+                f"Call the tool again with a single JSON object that matches its parameters."
+            ) from e
+        if not isinstance(tool_args, dict):
+            model_guard.count("bad_tool_arguments")
+            raise ToolArgumentsError(
+                f"Error: the arguments of {tool_name} must be a JSON object, got {type(tool_args).__name__}."
+            )
+        tool_func = self.tool_func_map.get(tool_name)
+        if tool_func is not None:
+            try:
+                inspect.signature(tool_func).bind(**tool_args)
+            except TypeError as e:
+                model_guard.count("bad_tool_arguments")
+                raise ToolArgumentsError(f"Error: invalid arguments for {tool_name}: {e}.") from e
+        args_str = json.dumps(tool_args, ensure_ascii=False)
+
+        # 限制参数输出长度
+        max_len = 200
+        if len(args_str) > max_len:
+            args_str = args_str[:max_len] + "..."
+
+        print(f"工具调用：{tool_name}，参数：{args_str}")
+        return tool_name, tool_args, tool_func
+
+    def _execute_tool_call(self, tool_call) -> str:
+        tool_start = time.perf_counter()
+        try:
+            tool_name, tool_args, tool_func = self._prepare_tool_call(tool_call)
+        except ToolArgumentsError as e:
+            # 参数无法解析时把错误返回给模型，由它重新调用
+            return self._tool_argument_error(tool_call, e, tool_start)
+        if tool_func is None:
+            tool_result = f"Unknown tool: {tool_name}"
+        elif self.tool_timeout is None:
+            tool_result = tool_func(**tool_args)
+        else:
+            # 与 arun() 相同：超时后不再等待，线程中的工具调用自行结束
+            pool = ThreadPoolExecutor(max_workers=1)
+            future = submit_in_context(pool, tool_func, **tool_args)
+            pool.shutdown(wait=False)
+            try:
+                tool_result = future.result(timeout=self.tool_timeout)
+            except FutureTimeoutError:
+                tool_result = f"Tool {tool_name} timed out after {self.tool_timeout}s"
+        self._record_tool_call(tool_name, time.perf_counter() - tool_start, tool_result)
+        print("工具调用结果：", str(tool_result)[:200] + "...")
+        return tool_result
+
+    def _record_tool_call(self, tool_name: str, duration: float, tool_result) -> None:
+        self._record("tool_call", tool=tool_name, duration=duration,
+                     result_chars=len(str(tool_result)))
+
+    def _tool_argument_error(self, tool_call, error: Exception, tool_start: float) -> str:
+        tool_result = str(error)
+        self._record_tool_call(tool_call.function.name, time.perf_counter() - tool_start, tool_result)
+        print("工具参数无效：", tool_result)
+        return tool_result
+
+    async def _aexecute_tool_call(self, tool_call) -> str:
+        tool_start = time.perf_counter()
+        try:
+            tool_name, tool_args, tool_func = self._prepare_tool_call(tool_call)
+        except ToolArgumentsError as e:
+            return self._tool_argument_error(tool_call, e, tool_start)
+        if tool_func is None:
+            tool_result = f"Unknown tool: {tool_name}"
+        else:
+            # 异步工具直接 await，同步工具放到线程中执行
+            if inspect.iscoroutinefunction(tool_func):
+                call = tool_func(**tool_args)
+            else:
+                call = asyncio.to_thread(tool_func, **tool_args)
+            try:
+                tool_result = await asyncio.wait_for(call, timeout=self.tool_timeout)
+            except asyncio.TimeoutError:
+                tool_result = f"Tool {tool_name} timed out after {self.tool_timeout}s"
+        self._record_tool_call(tool_name, time.perf_counter() - tool_start, tool_result)
+        print("工具调用结果：", str(tool_result)[:200] + "...")
+        return tool_result
+
+    def _tool_call_groups(self, tool_calls) -> list[list[int]]:
+        """
+        Split the tool calls of one turn into groups that may run concurrently.
+        Consecutive calls to parallel-safe tools share a group; any other tool
+        acts as a barrier and gets a group of its own.
+        """
+        if not self.parallel_tools:
+            return [[i] for i in range(len(tool_calls))]
+
+        groups, batch = [], []
+        for i, tool_call in enumerate(tool_calls):
+            if self.tool_parallel_safe.get(tool_call.function.name, False):
+                batch.append(i)
+            else:
+                if batch:
+                    groups.append(batch)
+                    batch = []
+                groups.append([i])
+        if batch:
+            groups.append(batch)
+        return groups
+
+    def _dispatch_tool_calls(self, tool_calls) -> list:
+        """
+        Run the tool calls of one model turn and return their results in call order.
+        """
+        results = [None] * len(tool_calls)
+        groups = self._tool_call_groups(tool_calls)
+        if all(len(group) == 1 for group in groups):
+            return [self._execute_tool_call(tc) for tc in tool_calls]
+
+        with ThreadPoolExecutor(max_workers=self.max_tool_workers) as pool:
+            for group in groups:
+                futures = [(i, submit_in_context(pool, self._execute_tool_call, tool_calls[i])) for i in group]
+                for i, future in futures:
+                    results[i] = future.result()
+        return results
+
+    async def _adispatch_tool_calls(self, tool_calls) -> list:
+        results = [None] * len(tool_calls)
+        for group in self._tool_call_groups(tool_calls):
+            group_results = await asyncio.gather(
+                *(self._aexecute_tool_call(tool_calls[i]) for i in group)
+            )
+            for i, result in zip(group, group_results):
+                results[i] = result
+        return results
+
     # 以下需在子类实现
     def context(self) -> str:
         raise NotImplementedError("Subclasses should implement this method.")
@@ -8,6 +8,8 @@ class GradStuAgent(BaseAgent):
                 1. Accept the research topic and key questions provided by the user.
                 2. Call the Literature Retrieval Agent to fetch the most relevant papers for this topic.
                 3. Read the retrieved abstracts and extract the main ideas, methods, and research trends.
+                   Start from read_digests, which gives the method, dataset, results and limitations of every paper,
+                   then use search_literature to pull the relevant passages; read whole papers only when necessary.
                 4. Write a comprehensive draft of the literature review that includes:
                 - Introduction
                 - Related Work / Current Progress
@@ -37,50 +39,27 @@ class GradStuAgent(BaseAgent):
         return ""
     
     def perceive_environment(self) -> dict[str, str]:
+        env = self.environment
         result = {}
 
         # --- Existing literaturetime ---
-        retrieve_dir = os.path.join(self.workdir, "retrieve_result")
-        os.makedirs(retrieve_dir, exist_ok=True)
-        
-        retrieve_files = [
-            os.path.join(self.workdir, "retrieve_result", f)
-            for f in os.listdir(retrieve_dir)
-            if os.path.isfile(os.path.join(retrieve_dir, f))
-        ]
-        result["Existing literaturetime"] = ", ".join(retrieve_files)
+        result["Existing literaturetime"] = env.describe(self.agent_name, "retrieve_result", "papers")
 
-        # --- Existing review version ---
-        review_dir = os.path.join(self.workdir, "reviews")
-        os.makedirs(review_dir, exist_ok=True)
+        # --- Paper digests ---
+        digest_path = os.path.join(self.workdir, "digests", "digests.md")
+        result["Paper digests"] = digest_path if "digests.md" in env.names("digests") else ""
 
-        review_files = [
-            os.path.join(self.workdir, "reviews", f)
-            for f in os.listdir(review_dir)
-            if os.path.isfile(os.path.join(review_dir, f))
-        ]
-        result["Existing review version"] = ", ".join(review_files)
+        # --- Existing review version ---
+        result["Existing review version"] = env.describe(self.agent_name, "reviews", "reviews")
 
         # --- Existing comments ---
-        comments_dir = os.path.join(self.workdir, "comments")
-        os.makedirs(comments_dir, exist_ok=True)
-
-        comment_files = [
-            os.path.join(self.workdir, "comments", f)
-            for f in os.listdir(comments_dir)
-            if os.path.isfile(os.path.join(comments_dir, f))
-        ]
-        result["Existing comments"] = ", ".join(comment_files)
+        result["Existing comments"] = env.describe(self.agent_name, "comments", "comments")
 
         # --- Score ---
-        score_path = os.path.join(self.workdir, "score.md")
-        if os.path.isfile(score_path):
-            with open(score_path, "r", encoding="utf-8") as f:
-                score_content = f.read().strip()
-        else:
-            score_content = ""  # 文件不存在则为空
-
-        result["score"] = score_content
+        score = None
+        if self.shared_state is not None:
+            score = self.shared_state.get("Professor", {}).get("score")
+        result["score"] = "" if score is None else str(score)
 
         return result
 
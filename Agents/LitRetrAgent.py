@@ -1,5 +1,4 @@
 from Agents.BaseAgent import BaseAgent
-import os
 
 class LitRetrAgent(BaseAgent):
     def context(self) -> str:
@@ -19,31 +18,13 @@ class LitRetrAgent(BaseAgent):
 
 
     def perceive_environment(self) -> dict[str, str]:
+        env = self.environment
         result = {}
 
         # --- Existing literaturetime ---
-        target_dir = os.path.join(self.workdir, "retrieve_result")
-        os.makedirs(target_dir, exist_ok=True)
-
-        file_names = [
-            os.path.join(self.workdir, "retrieve_result", f)
-            for f in os.listdir(target_dir)
-            if os.path.isfile(os.path.join(target_dir, f))
-        ]
-        result["Existing literaturetime"] = ", ".join(file_names)
+        result["Existing literaturetime"] = env.describe(self.agent_name, "retrieve_result", "papers")
 
         # --- Requirements ---
-        requirements_dir = os.path.join(self.workdir, "requirements")
-        os.makedirs(requirements_dir, exist_ok=True)
-
-        requirement_files = [
-            os.path.join(self.workdir, "requirements", f)
-            for f in os.listdir(requirements_dir)
-            if os.path.isfile(os.path.join(requirements_dir, f))
-        ]
-        result["requirements"] = ", ".join(requirement_files)
+        result["requirements"] = env.describe(self.agent_name, "requirements", "requirements")
 
         return result
-
-
-
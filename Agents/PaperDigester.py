@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Agents.ResponseCache import ResponseCache
+from metrics import cached_prompt_tokens
+from rate_limit import ConcurrencyLimit
+
+DIGEST_FIELDS = ("title", "method", "dataset", "results", "limitations")
+
+DIGEST_PROMPT = """
+You summarize one research paper for a literature review.
+Return a JSON object with exactly these string fields:
+  "title":       the paper title,
+  "method":      the proposed method or approach (2-4 sentences),
+  "dataset":     datasets, benchmarks or experimental setting,
+  "results":     main quantitative and qualitative findings,
+  "limitations": limitations and open problems stated or evident.
+Be factual and concise; write "N/A" when the paper does not say.
+"""
+
+
+class PaperDigester:
+    """
+    Map-reduce summarization stage that runs between LitRetrAgent and GradStuAgent.
+
+    Map: every paper is summarized independently into a structured digest
+    (title, method, dataset, results, limitations). At most `max_workers` model
+    calls run in parallel. Digests are cached by paper content key, so a paper
+    is never summarized twice.
+    Reduce: all digests are merged into one Markdown file that GradStuAgent
+    reads instead of the full texts.
+    Model calls go through the same ResponseCache as the agents, so
+    --llm_cache record / replay covers digests too.
+    """
+
+    def __init__(self, route, workdir, page_reader, key_func,
+                 max_workers=4, max_chars=30000, metrics=None, cache_dir=None, llm_limit=None,
+                 llm_cache="passthrough", llm_cache_dir=None):
+        # model_backends.ModelRoute：摘要使用的模型端点及备用端点
+        self.route = route
+        self.workdir = workdir
+        self.page_reader = page_reader
+        self.key_func = key_func
+        self.max_workers = max_workers
+        self.max_chars = max_chars
+        self.metrics = metrics
+        self.iteration = None
+        self.llm_limit = llm_limit or ConcurrencyLimit()
+
+        # 摘要缓存按论文内容区分，可在多个任务之间共享
+        self.cache_dir = cache_dir or os.path.join(workdir, ".cache", "digests")
+        self.output_path = os.path.join(workdir, "digests", "digests.md")
+
+        # 模型响应缓存：与各 Agent 使用同一目录与模式
+        self.response_cache = ResponseCache(
+            llm_cache_dir or os.path.join(workdir, ".cache", "llm"), mode=llm_cache
+        )
+
+    def _digest_kwargs(self, text: str) -> dict:
+        return dict(
+            model=self.route.primary.model,
+            messages=[
+                {"role": "system", "content": DIGEST_PROMPT},
+                {"role": "user", "content": text},
+            ],
+            response_format={"type": "json_object"},
+            stream=False,
+        )
+
+    def _request_digest(self, endpoint, kwargs: dict):
+        # 备用端点使用自己的模型名
+        return endpoint.client.chat.completions.create(**{**kwargs, "model": endpoint.model})
+
+    def _create_completion(self, kwargs: dict):
+        if self.response_cache.mode == "replay":
+            return self.response_cache.replay(kwargs)
+        response = self.route.call(self._request_digest, kwargs, limit=self.llm_limit)
+        if self.response_cache.mode == "record":
+            self.response_cache.record(kwargs, response)
+        return response
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _paper_text(self, path: str) -> str:
+        parts, used = [], 0
+        for page_number, text in self.page_reader(path):
+            page_text = f"--- Page {page_number} ---\n{text}\n"
+            parts.append(page_text[:self.max_chars - used])
+            used += len(page_text)
+            if used >= self.max_chars:
+                break
+        return "".join(parts)
+
+    def digest(self, path: str) -> dict:
+        """
+        Return the digest of one paper, summarizing it only on a cache miss.
+        """
+        cache_path = self._cache_path(self.key_func(path))
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                return {**json.load(f), "path": path}
+
+        text = self._paper_text(path)
+        start = time.perf_counter()
+        response = self._create_completion(self._digest_kwargs(text))
+        if self.metrics is not None:
+            usage = response.usage
+            self.metrics.record(
+                "model_call", type(self).__name__, self.iteration,
+                latency=time.perf_counter() - start,
+                prompt_tokens=getattr(usage, "prompt_tokens", None),
+                completion_tokens=getattr(usage, "completion_tokens", None),
+                cached_tokens=cached_prompt_tokens(usage),
+                cached=self.response_cache.mode == "replay",
+                paper=path,
+            )
+
+        content = response.choices[0].message.content or ""
+        try:
+            data = json.loads(content)
+            digest = {field: str(data.get(field, "N/A")) for field in DIGEST_FIELDS}
+        except json.JSONDecodeError:
+            # 模型没有按 JSON 返回时保留原文
+            digest = {field: "N/A" for field in DIGEST_FIELDS}
+            digest["results"] = content.strip()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(digest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cache_path)
+        return {**digest, "path": path}
+
+    def run(self, paths: list[str]) -> str | None:
+        """
+        Digest all papers in parallel and write the combined digest file.
+        Returns its path, or None when there is nothing to digest.
+        """
+        if not paths:
+            return None
+
+        def safe_digest(path):
+            try:
+                return self.digest(path)
+            except Exception as e:
+                print(f"论文摘要失败 {path}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            digests = [d for d in pool.map(safe_digest, paths) if d]
+
+        sections = []
+        for d in digests:
+            sections.append(
+                f"## {d['title']}\n\n"
+                f"**File:** {d['path']}\n\n"
+                f"**Method:** {d['method']}\n\n"
+                f"**Dataset:** {d['dataset']}\n\n"
+                f"**Results:** {d['results']}\n\n"
+                f"**Limitations:** {d['limitations']}\n"
+            )
+
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        with open(self.output_path, "w", encoding="utf-8") as f:
+            f.write(f"# Paper digests ({len(digests)} papers)\n\n" + "\n---\n\n".join(sections))
+        print(f"论文摘要已更新：{len(digests)}/{len(paths)} 篇 -> {self.output_path}")
+        return self.output_path
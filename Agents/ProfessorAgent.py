@@ -1,5 +1,4 @@
 from Agents.BaseAgent import BaseAgent
-import os
 
 class ProfessorAgent(BaseAgent):
     def context(self) -> str:
@@ -16,29 +15,13 @@ class ProfessorAgent(BaseAgent):
         return ""
 
     def perceive_environment(self) -> dict[str, str]:
+        env = self.environment
         result = {}
 
         # --- Existing review version ---
-        review_dir = os.path.join(self.workdir, "reviews")
-        os.makedirs(review_dir, exist_ok=True)
-
-        review_files = [
-            os.path.join(self.workdir, "reviews", f)
-            for f in os.listdir(review_dir)
-            if os.path.isfile(os.path.join(review_dir, f))
-        ]
-        result["Existing review version"] = ", ".join(review_files)
+        result["Existing review version"] = env.describe(self.agent_name, "reviews", "reviews")
 
         # --- Existing comments ---
-        comments_dir = os.path.join(self.workdir, "comments")
-        os.makedirs(comments_dir, exist_ok=True)
-
-        comment_files = [
-            os.path.join(self.workdir, "comments", f)
-            for f in os.listdir(comments_dir)
-            if os.path.isfile(os.path.join(comments_dir, f))
-        ]
-        result["Existing comments"] = ", ".join(comment_files)
-        # print(result)
+        result["Existing comments"] = env.describe(self.agent_name, "comments", "comments")
 
         return result
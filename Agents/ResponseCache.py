@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import time
+
+from openai.types.chat import ChatCompletion
+
+MODES = ("passthrough", "record", "replay")
+
+
+class ResponseCache:
+    """
+    Directory store of chat completions keyed by a hash of the request.
+
+    Modes:
+        passthrough: always call the API, never touch the cache.
+        record:      call the API and store every response.
+        replay:      serve responses from the cache only; a miss raises LookupError.
+    The key covers everything that determines the completion: model,
+    messages, tools and tool_choice. Transport options such as stream are
+    left out, so recorded streamed and non-streamed runs replay the same way.
+    """
+
+    KEY_FIELDS = ("model", "messages", "tools", "tool_choice", "temperature", "response_format")
+
+    def __init__(self, cache_dir: str, mode: str = "passthrough"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode} (expected one of {MODES})")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, request: dict) -> str:
+        payload = {k: request.get(k) for k in self.KEY_FIELDS}
+        blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def replay(self, request: dict) -> ChatCompletion:
+        key = self.key(request)
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            raise LookupError(f"LLM cache miss in replay mode: {key}")
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.hits += 1
+        return ChatCompletion.model_validate(data["response"])
+
+    def record(self, request: dict, response) -> None:
+        """
+        Store a response. `response` is a ChatCompletion or an equivalent dict.
+        """
+        if hasattr(response, "model_dump"):
+            response = response.model_dump(exclude_unset=True)
+        key = self.key(request)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # 先写临时文件再原子替换，避免并发写入时读到半截内容
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"recorded_at": time.time(), "response": response}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
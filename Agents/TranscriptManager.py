@@ -0,0 +1,149 @@
+import json
+import threading
+from collections import OrderedDict
+
+# tiktoken 编码表在第一次计数时才加载，未安装时退回到字符数估算
+_ENCODING = None
+_ENCODING_LOADED = False
+
+# 计数缓存以 (长度, 哈希) 为键，不持有原始字符串（工具输出可能很大）
+TOKEN_CACHE_SIZE = 2048
+_token_counts: OrderedDict[tuple[int, int], int] = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+def _encoding():
+    global _ENCODING, _ENCODING_LOADED
+    if not _ENCODING_LOADED:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _ENCODING = None
+        _ENCODING_LOADED = True
+    return _ENCODING
+
+
+def count_text_tokens(text: str) -> int:
+    """
+    Count the tokens of a string with tiktoken, or estimate them when it is not
+    installed (about 4 ASCII characters per token, 1 token per other character).
+    """
+    if not text:
+        return 0
+    key = (len(text), hash(text))
+    with _token_counts_lock:
+        if key in _token_counts:
+            _token_counts.move_to_end(key)
+            return _token_counts[key]
+
+    encoding = _encoding()
+    if encoding is not None:
+        tokens = len(encoding.encode(text, disallowed_special=()))
+    else:
+        ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+        tokens = (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+    with _token_counts_lock:
+        _token_counts[key] = tokens
+        if len(_token_counts) > TOKEN_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return tokens
+
+
+class TranscriptManager:
+    """
+    Keeps the in-run message list of BaseAgent.run within a token budget.
+
+    Before each model call, compact() measures the transcript. When it is over
+    budget, compact() replaces the oldest large tool outputs (and large tool-call
+    arguments, e.g. a saved draft) with short references. It works from the
+    oldest message forward and always keeps the most recent `keep_recent`
+    tool results intact.
+    """
+
+    # 每条消息的固定开销（role、分隔符等）
+    MESSAGE_OVERHEAD = 4
+
+    def __init__(self, max_tokens: int = 48000, keep_recent: int = 2,
+                 min_elide_chars: int = 2000, preview_chars: int = 300):
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.min_elide_chars = min_elide_chars
+        self.preview_chars = preview_chars
+
+    def message_tokens(self, message: dict) -> int:
+        tokens = self.MESSAGE_OVERHEAD + count_text_tokens(message.get("content") or "")
+        for tool_call in message.get("tool_calls") or []:
+            tokens += count_text_tokens(tool_call["function"]["name"])
+            tokens += count_text_tokens(tool_call["function"]["arguments"])
+        return tokens
+
+    def count_tokens(self, messages: list) -> int:
+        return sum(self.message_tokens(m) for m in messages)
+
+    def compact(self, messages: list) -> dict:
+        """
+        Shrink `messages` in place until it fits the budget (or nothing is left
+        to elide) and return prompt-size metrics for this step.
+        """
+        tokens = initial_tokens = self.count_tokens(messages)
+        elided = 0
+
+        if tokens > self.max_tokens:
+            tool_names = {}
+            for m in messages:
+                for tool_call in m.get("tool_calls") or []:
+                    tool_names[tool_call["id"]] = tool_call["function"]["name"]
+
+            tool_positions = [i for i, m in enumerate(messages) if m.get("role") == "tool"]
+            protected = set(tool_positions[-self.keep_recent:]) if self.keep_recent else set()
+
+            for i, m in enumerate(messages):
+                if tokens <= self.max_tokens:
+                    break
+                if i in protected:
+                    continue
+                before = self.message_tokens(m)
+                if m.get("role") == "tool":
+                    if not self._elide_tool_result(m, tool_names.get(m.get("tool_call_id"), "tool")):
+                        continue
+                elif m.get("tool_calls"):
+                    if not self._elide_tool_arguments(m):
+                        continue
+                else:
+                    continue
+                tokens -= before - self.message_tokens(m)
+                elided += 1
+
+        return {
+            "messages": len(messages),
+            "prompt_chars": sum(len(m.get("content") or "") for m in messages),
+            "prompt_tokens": tokens,
+            "elided": elided,
+            "elided_tokens": initial_tokens - tokens,
+        }
+
+    def _elide_tool_result(self, message: dict, tool_name: str) -> bool:
+        content = message.get("content") or ""
+        if len(content) < self.min_elide_chars:
+            return False
+        preview = " ".join(content[:self.preview_chars].split())
+        message["content"] = (
+            f"[Earlier {tool_name} result elided to save context ({len(content)} chars). "
+            f"Beginning: {preview} ... Call {tool_name} again with the same arguments "
+            f"if you need the full output.]"
+        )
+        return True
+
+    def _elide_tool_arguments(self, message: dict) -> bool:
+        changed = False
+        for tool_call in message["tool_calls"]:
+            arguments = tool_call["function"]["arguments"]
+            if len(arguments) < self.min_elide_chars:
+                continue
+            tool_call["function"]["arguments"] = json.dumps(
+                {"_elided": f"{len(arguments)} chars of arguments elided to save context"}
+            )
+            changed = True
+        return changed
@@ -1,13 +1,27 @@
 from Agents.ProfessorAgent import ProfessorAgent
 from Agents.LitRetrAgent import LitRetrAgent
 from Agents.GradStuAgent import GradStuAgent
-from tools import ALL_TOOLS
+from Agents.PaperDigester import PaperDigester
+from tools import ALL_TOOLS, iter_pdf_pages, pdf_text_cache
+from state_store import state_store_for
+from workspace import cache_path, use_workdir
+from events import event_bus, RETRIEVAL_REQUESTED, PAPERS_RETRIEVED, DRAFT_SAVED, SCORE_SAVED
+from scheduler import AgentScheduler, AGENT_STARTED, AGENT_FINISHED
+from metrics import MetricsRecorder
+from resilience import model_guard
+from model_backends import model_router
+from http_clients import http_clients
+from environment_state import EnvironmentState
+from checkpoint import Checkpoint
+import asyncio
 import os
 import time
-import json
+from collections import Counter
 
 class AutoReview_workflow:
-    def __init__(self, input_str, topic = None, api_key = None, workdir = None, max_iter = None):
+    def __init__(self, input_str, topic = None, api_key = None, workdir = None, max_iter = None, parallel_tools = False,
+                 model_timeout = None, tool_timeout = None, stream = False, llm_cache = "passthrough",
+                 digest_papers = True, digest_workers = 4, llm_limit = None, resume = False):
         self.topic = topic
 
         self.input = input_str
@@ -16,87 +30,287 @@ class AutoReview_workflow:
 
         self.max_iter = max_iter
 
+        self.iteration = None
+        self.score = 0
+        # 最近一次 run() / arun() 的耗时（秒）
+        self.elapsed_s = None
+
         self.api_key = api_key
         tools_map_GradStu = { "read_literature"          : ALL_TOOLS["read_literature"],
+                               "read_literatures"        : ALL_TOOLS["read_literatures"],
+                               "search_literature"       : ALL_TOOLS["search_literature"],
+                               "read_digests"            : ALL_TOOLS["read_digests"],
+                               "list_files"              : ALL_TOOLS["list_files"],
                                "save_review"             : ALL_TOOLS["save_review"],
                                "read_comment"            : ALL_TOOLS["read_comment"],
                                "save_retrieval_request"  : ALL_TOOLS["save_retrieval_request"],
                                }
 
         tools_map_LitRetr = { "find_papers_by_str"   : ALL_TOOLS["find_papers_by_str"],
-                              "retrieve_full_paper"  : ALL_TOOLS["retrieve_full_paper"] }
+                              "retrieve_full_paper"  : ALL_TOOLS["retrieve_full_paper"],
+                              "retrieve_full_papers" : ALL_TOOLS["retrieve_full_papers"],
+                              "list_files"           : ALL_TOOLS["list_files"] }
         
         tools_map_Professor = { "read_review"            : ALL_TOOLS["read_review"],
                                "save_comment"    : ALL_TOOLS["save_comment"],
-                               "save_score"          : ALL_TOOLS["save_score"] }
+                               "save_score"          : ALL_TOOLS["save_score"],
+                               "list_files"          : ALL_TOOLS["list_files"] }
+
+        # 各 Agent 共用一个统计记录器，事件实时写入 workdir/metrics.jsonl
+        self.metrics = MetricsRecorder(os.path.join(self.workdir, "metrics.jsonl"))
+
+        # 各 Agent 共用一个目录状态服务，目录未变化时不再重复扫描
+        self.environment = EnvironmentState(self.workdir)
+
+        # 本任务的共享状态；工具通过当前 workdir 找到同一个 store
+        self.state = state_store_for(self.workdir)
 
-        self.GradStu = GradStuAgent(tools = tools_map_GradStu, api_key = self.api_key, workdir = self.workdir, topic = self.topic)
-        self.LitRetr = LitRetrAgent(tools = tools_map_LitRetr, api_key = self.api_key, workdir = self.workdir, topic = self.topic)
-        self.Professor = ProfessorAgent(tools = tools_map_Professor, api_key = self.api_key, workdir = self.workdir, topic = self.topic)
+        agent_kwargs = dict(api_key = self.api_key, workdir = self.workdir, topic = self.topic,
+                            parallel_tools = parallel_tools,
+                            model_timeout = model_timeout, tool_timeout = tool_timeout,
+                            stream = stream, metrics = self.metrics, llm_cache = llm_cache,
+                            environment = self.environment, state = self.state, llm_limit = llm_limit)
+
+        self.GradStu = GradStuAgent(tools = tools_map_GradStu, **agent_kwargs)
+        self.LitRetr = LitRetrAgent(tools = tools_map_LitRetr, **agent_kwargs)
+        self.Professor = ProfessorAgent(tools = tools_map_Professor, **agent_kwargs)
+        self._agents = {"GradStu": self.GradStu, "LitRetr": self.LitRetr, "Professor": self.Professor}
+
+        # 每个 Agent 回合结束后写检查点，--resume 时从中恢复
+        self.resume = resume
+        self.checkpoint = Checkpoint(os.path.join(self.workdir, "checkpoint.json"))
+        self._turns = {}
+
+        # LitRetr 与 GradStu 之间的论文摘要阶段（按论文内容缓存，并发受限）
+        self.digester = None
+        if digest_papers:
+            self.digester = PaperDigester(route = model_router.route("PaperDigester", self.api_key), workdir = self.workdir,
+                                          page_reader = iter_pdf_pages, key_func = pdf_text_cache.doc_key,
+                                          max_workers = digest_workers, metrics = self.metrics,
+                                          cache_dir = cache_path("digests"), llm_limit = llm_limit,
+                                          llm_cache = llm_cache)
 
     # 拟定
     def run(self):
-        print(f"{self.topic}, Start Review!\n")
+        """
+        Run the review with the event-driven scheduler: every agent runs as soon
+        as the events it waits for have been published, so e.g. LitRetr can
+        fetch new papers while the Professor reviews the previous draft.
+        """
+        # 所有工具都写入本任务的 workdir
+        start = time.perf_counter()
+        try:
+            with use_workdir(self.workdir):
+                scheduler = self._build_scheduler()
+                self._start(scheduler)
+                self._finish(scheduler, scheduler.run())
+        finally:
+            self.elapsed_s = time.perf_counter() - start
 
-        # self.GradStu.run(self.input)
+    async def arun(self):
+        """
+        Async counterpart of run(): the same scheduling, with the agents driven
+        by BaseAgent.arun so that several workflows can share one event loop.
+        """
+        start = time.perf_counter()
+        try:
+            with use_workdir(self.workdir):
+                scheduler = self._build_scheduler()
+                self._start(scheduler)
+                self._finish(scheduler, await scheduler.arun())
+        finally:
+            self.elapsed_s = time.perf_counter() - start
 
-        # 读取配置文件
-        with open("workdir/config.json", "r", encoding="utf-8") as f:
-            config = json.load(f)
+    def _build_scheduler(self):
+        scheduler = AgentScheduler(event_bus, workdir = self.workdir)
 
-        for i in range(1, self.max_iter + 1):
-            print(f"===== Iteration {i} =====")
+        # LitRetr 下载完成后先生成论文摘要，再通知 GradStu
+        def retrieve(user_input):
+            self.LitRetr.run(user_input)
+            self.summarize_papers()
+            scheduler.notify(PAPERS_RETRIEVED)
 
-            print("GradStuAgent: Writing draft review...")
+        async def aretrieve(user_input):
+            await self.LitRetr.arun(user_input)
+            await asyncio.to_thread(self.summarize_papers)
+            scheduler.notify(PAPERS_RETRIEVED)
 
-            while True:
-                if i <= 1:
-                    self.GradStu.run(self.input)
-                else:
-                    self.GradStu.run()
+        scheduler.register("GradStu", self.GradStu.run, self.GradStu.arun)
+        scheduler.register("LitRetr", retrieve, aretrieve)
+        scheduler.register("Professor", self.Professor.run, self.Professor.arun)
 
-                litretr_enabled = config.get("LitRetr", {}).get("enabled", False)
-                litretr_input = config.get("LitRetr", {}).get("input", "")
+        # GradStu 本次运行是否已触发后续工作（保存草稿或请求检索）
+        handed_over = {"GradStu": False}
 
-                if litretr_enabled:
-                    print("LitRetrAgent: Searching papers...")
-                    self.LitRetr.run(litretr_input)
-                    config["LitRetr"]["enabled"] = False
-                else:
-                    print("LitRetrAgent: Skipped (disabled in config).")
-                    break
+        def on_started(event):
+            messages = {"GradStu": "GradStuAgent: Writing draft review...",
+                        "LitRetr": "LitRetrAgent: Searching papers...",
+                        "Professor": "ProfessorAgent: Reviewing draft..."}
+            print(messages[event["agent"]])
+            if event["agent"] == "GradStu":
+                handed_over["GradStu"] = False
+            elif event["agent"] == "LitRetr":
+                # 请求已被取走，避免下次启动时重复检索
+                self.state.update("LitRetr", enabled=False)
 
-            print("ProfessorAgent: Reviewing draft...")
-            self.Professor.run()
+        def on_retrieval_requested(event):
+            if event["enabled"]:
+                handed_over["GradStu"] = True
+                scheduler.schedule("LitRetr", event["input"])
 
-            score = self.read_score()
-            print(f"[Iteration {i}] Current Score: {score}")
+        def on_draft_saved(event):
+            handed_over["GradStu"] = True
+            scheduler.schedule("Professor")
+
+        def on_score_saved(event):
+            self.score = float(event["score"])
+            print(f"[Iteration {self.iteration}] Current Score: {self.score}")
+            if self.score > 90:
+                scheduler.stop("🎯 Score > 90, Review Complete!")
+
+        def on_finished(event):
+            # 失败的回合不推进流程，也不覆盖上一个检查点
+            if event.get("error") is not None:
+                return
+            if event["agent"] == "GradStu" and not handed_over["GradStu"]:
+                # 既没有保存草稿也没有请求检索：与原串行流程一致，交给 Professor 审阅
+                if not scheduler.is_busy("LitRetr") and not scheduler.is_busy("Professor"):
+                    scheduler.schedule("Professor")
+            elif event["agent"] == "Professor":
+                if self.iteration >= self.max_iter:
+                    scheduler.stop("Reached maximum iterations, stopping process.")
+                else:
+                    self.set_iteration(self.iteration + 1)
+                    print(f"===== Iteration {self.iteration} =====")
+                    scheduler.schedule("GradStu")
 
-            if score > 90:
-                print("🎯 Score > 90, Review Complete!")
-                break
+            # 每个完成的回合之后写检查点
+            self._turns[event["agent"]] = self._agent_snapshot(self._agents[event["agent"]])
+            self._save_checkpoint(scheduler)
 
-            user_choice = input("继续下一次迭代吗？(y/n): ").strip().lower()
-            if user_choice != "y":
-                print("用户选择停止迭代，流程结束。")
-                break
+        scheduler.on(AGENT_STARTED, on_started)
+        scheduler.on(RETRIEVAL_REQUESTED, on_retrieval_requested)
+        scheduler.on(PAPERS_RETRIEVED, lambda event: scheduler.schedule("GradStu"))
+        scheduler.on(DRAFT_SAVED, on_draft_saved)
+        scheduler.on(SCORE_SAVED, on_score_saved)
+        scheduler.on(AGENT_FINISHED, on_finished)
+        return scheduler
 
-            time.sleep(1)
+    def _start(self, scheduler):
+        print(f"{self.topic}, Start Review!\n")
+        checkpoint = self.checkpoint.load() if self.resume else None
+        if self.resume and checkpoint is None:
+            print("未找到检查点，从头开始。")
 
+        if checkpoint is not None:
+            self._restore(checkpoint, scheduler)
         else:
-            print("Reached maximum iterations, stopping process.")
+            self.score = 0
+            self.set_iteration(1)
+            print(f"===== Iteration {self.iteration} =====")
+            scheduler.schedule("GradStu", self.input)
+
+        # 上次运行遗留的检索请求直接交给 LitRetr，与 GradStu 并行
+        litretr = self.state.get("LitRetr", {})
+        if litretr.get("enabled", False):
+            scheduler.schedule("LitRetr", litretr.get("input", ""))
+
+        self._turns = {name: self._agent_snapshot(agent) for name, agent in self._agents.items()}
+        self._save_checkpoint(scheduler)
+
+    def _restore(self, checkpoint, scheduler):
+        for name, agent in self._agents.items():
+            saved = checkpoint["agents"].get(name, {})
+            agent.history = [tuple(turn) for turn in saved.get("history", [])]
+            agent.step_number = saved.get("step_number", 0)
+        for key, value in checkpoint.get("state", {}).items():
+            self.state.set(key, value)
+        self.score = checkpoint.get("score", 0)
+        self.set_iteration(checkpoint.get("iteration", 1))
+
+        if checkpoint.get("finished"):
+            print(f"检查点显示该任务已结束：{checkpoint['finished']}")
+            scheduler.stop(checkpoint["finished"])
+            return
+
+        for name, inputs in checkpoint.get("queued", {}).items():
+            for user_input in inputs:
+                scheduler.schedule(name, user_input)
+        queued = ", ".join(f"{name} x{len(inputs)}" for name, inputs in checkpoint.get("queued", {}).items() if inputs)
+        print(f"从检查点恢复：Iteration {self.iteration}，待运行：{queued or '无'}")
+
+    @staticmethod
+    def _agent_snapshot(agent) -> dict:
+        return {"history": [list(turn) for turn in agent.history], "step_number": agent.step_number}
+
+    def _save_checkpoint(self, scheduler, finished = None):
+        self.checkpoint.save({
+            "topic": self.topic,
+            "iteration": self.iteration,
+            "score": self.score,
+            "agents": self._turns,
+            "queued": scheduler.queued_runs(),
+            "state": self.state.snapshot(),
+            "finished": finished,
+        })
 
+    def _finish(self, scheduler, reason):
+        print(reason)
+        self._save_checkpoint(scheduler, finished = reason)
+        self.report_metrics()
+
+    def set_iteration(self, i):
+        self.iteration = i
+        for agent in (self.GradStu, self.LitRetr, self.Professor, self.digester):
+            if agent is not None:
+                agent.iteration = i
+
+    def summarize_papers(self):
+        """对 retrieve_result 中的论文生成结构化摘要，供 GradStuAgent 读取"""
+        if self.digester is None:
+            return
+        retrieve_dir = os.path.join(self.workdir, "retrieve_result")
+        if not os.path.isdir(retrieve_dir):
+            return
+        papers = sorted(
+            os.path.join(retrieve_dir, f) for f in os.listdir(retrieve_dir) if f.lower().endswith(".pdf")
+        )
+        print("PaperDigester: Summarizing papers...")
+        self.digester.run(papers)
+
+    def report_metrics(self):
+        """打印按 Agent、迭代轮次和工具汇总的耗时与 token 统计"""
+        for by in ("agent", "iteration", "tool"):
+            print(f"\n--- Metrics by {by} ---")
+            print(self.metrics.format_summary(by))
+        # 本任务各 Agent 所用模型端点的重试、超时、熔断、切换与延迟（端点在任务间共享，计数为进程累计），
+        # 以及无效工具参数计数
+        endpoints = []
+        for agent in (self.GradStu, self.LitRetr, self.Professor, self.digester):
+            for endpoint in (agent.route.endpoints if agent is not None else []):
+                if endpoint not in endpoints:
+                    endpoints.append(endpoint)
+        lines, totals = [], Counter()
+        for endpoint in endpoints:
+            stats = endpoint.stats()
+            latency, healthy = stats.pop("latency"), stats.pop("healthy")
+            totals.update(stats)
+            latency = f"{latency:.2f} s" if latency is not None else "n/a"
+            counts = ", ".join(f"{event}: {n}" for event, n in sorted(stats.items())) or "no calls"
+            lines.append(f"{endpoint.name} [{endpoint.model}] ({'healthy' if healthy else 'degraded'}, "
+                         f"avg latency {latency}): {counts}")
+        totals.update(model_guard.stats())
+        if totals:
+            lines.append("total: " + ", ".join(f"{event}: {n}" for event, n in sorted(totals.items())))
+        print("\n--- Model endpoints ---")
+        print("\n".join(lines))
+        print(f"\n详细事件记录：{self.metrics.path}")
 
     def read_score(self):
-        score_file = "workdir/score.md"
-        """从score.md文件读取分数"""
-        if not os.path.exists(score_file):
-            return 0  # 如果文件不存在，默认分数为0
+        """从共享状态读取 Professor 的评分"""
         try:
-            with open(score_file, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                return float(content)
-        except ValueError:
+            return float(self.state.get("Professor", {}).get("score", 0))
+        except (TypeError, ValueError):
             return 0  # 防止非数字内容导致异常
 
 
@@ -128,6 +342,26 @@ class AutoReview_workflow:
 
     
 
+async def run_workflows(workflows, max_concurrent = None, return_exceptions = False):
+    """
+    并发运行多个 AutoReview_workflow（同一事件循环），最多 max_concurrent 个同时运行。
+    return_exceptions 为 True 时，失败的工作流在结果中对应其异常，其余工作流照常运行。
+    """
+    slots = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+
+    async def run_one(workflow):
+        if slots is None:
+            return await workflow.arun()
+        async with slots:
+            return await workflow.arun()
+
+    try:
+        return await asyncio.gather(*(run_one(wf) for wf in workflows), return_exceptions = return_exceptions)
+    finally:
+        # 本事件循环的连接池随循环结束关闭
+        await http_clients.aclose()
+
+
 if __name__ == '__main__':
     pass
     # print(AutoReview_workflow.perceive_environment())
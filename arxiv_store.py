@@ -0,0 +1,224 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from workspace import cache_path
+
+DEFAULT_QUERY_TTL = 24 * 3600
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a search query so near-identical queries share one cache entry:
+    lower-case, punctuation stripped, duplicate words removed, words sorted.
+    """
+    return " ".join(sorted(set(re.findall(r"\w+", query.lower()))))
+
+
+class ArxivStore:
+    """
+    Local SQLite store of every arXiv record retrieved by ArxivSearch.
+
+    Two lookups are served without touching the network:
+      - a query-result cache keyed by the normalized query, valid for `query_ttl` seconds;
+      - an FTS5 full-text index over title and summary of all stored records,
+        used when a query's words all occur in at least N records fetched
+        within `query_ttl`; older records only serve as a fallback when the
+        arXiv API cannot be reached (search_index).
+    """
+
+    def __init__(self, path: str | None = None, query_ttl: float = DEFAULT_QUERY_TTL):
+        # 未指定时使用 workspace 中配置的缓存目录（打开时才解析）
+        self._path = path
+        self.query_ttl = query_ttl
+        self.has_fts = False
+        self.query_hits = 0
+        self.index_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._conn_path = None
+
+    @property
+    def path(self) -> str:
+        return self._path or cache_path("arxiv.sqlite3")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None and self._pid == os.getpid() and self._conn_path == self.path:
+            return self._conn
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS papers (
+                paper_id   TEXT PRIMARY KEY,
+                title      TEXT NOT NULL,
+                summary    TEXT NOT NULL,
+                published  TEXT,
+                pdf_url    TEXT,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS downloads (
+                paper_id      TEXT PRIMARY KEY,
+                path          TEXT NOT NULL,
+                size          INTEGER NOT NULL,
+                sha256        TEXT NOT NULL,
+                downloaded_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS queries (
+                query_key  TEXT PRIMARY KEY,
+                n          INTEGER NOT NULL,
+                paper_ids  TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            """
+        )
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts "
+                "USING fts5(paper_id UNINDEXED, title, summary)"
+            )
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # 部分 SQLite 编译版本不带 FTS5，此时只使用查询缓存
+            self.has_fts = False
+
+        self._conn = conn
+        self._pid = os.getpid()
+        self._conn_path = self.path
+        return conn
+
+    def save_results(self, query: str, n: int, records: list[dict]) -> None:
+        """
+        Store the records returned for a query and remember the query result.
+        Each record has paper_id, title, summary, published and pdf_url.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._upsert_papers(conn, records, now)
+                conn.execute(
+                    "INSERT OR REPLACE INTO queries (query_key, n, paper_ids, fetched_at) VALUES (?, ?, ?, ?)",
+                    (normalize_query(query), n, json.dumps([r["paper_id"] for r in records]), now),
+                )
+
+    def save_papers(self, records: list[dict]) -> None:
+        """
+        Store records that were not fetched by a query (e.g. resolved by ID).
+        """
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._upsert_papers(conn, records, time.time())
+
+    def _upsert_papers(self, conn: sqlite3.Connection, records: list[dict], now: float) -> None:
+        for r in records:
+            conn.execute(
+                "INSERT OR REPLACE INTO papers (paper_id, title, summary, published, pdf_url, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (r["paper_id"], r["title"], r["summary"], r.get("published"), r.get("pdf_url"), now),
+            )
+            if self.has_fts:
+                conn.execute("DELETE FROM papers_fts WHERE paper_id = ?", (r["paper_id"],))
+                conn.execute(
+                    "INSERT INTO papers_fts (paper_id, title, summary) VALUES (?, ?, ?)",
+                    (r["paper_id"], r["title"], r["summary"]),
+                )
+
+    def record_download(self, paper_id: str, path: str, size: int, sha256: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO downloads (paper_id, path, size, sha256, downloaded_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (paper_id, path, size, sha256, time.time()),
+                )
+
+    def get_download(self, paper_id: str) -> dict | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT * FROM downloads WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get(self, paper_id: str) -> dict | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT * FROM papers WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def lookup(self, query: str, n: int, use_index: bool = True) -> list[dict] | None:
+        """
+        Return up to n records for a query from the local store, or None when the
+        network has to be asked. The query-result cache is tried first, then the
+        full-text index; both only answer with records younger than `query_ttl`.
+        """
+        with self._lock:
+            conn = self._connect()
+
+            row = conn.execute(
+                "SELECT n, paper_ids, fetched_at FROM queries WHERE query_key = ?",
+                (normalize_query(query),),
+            ).fetchone()
+            if row and row["n"] >= n and time.time() - row["fetched_at"] <= self.query_ttl:
+                ids = json.loads(row["paper_ids"])[:n]
+                records = self._fetch(conn, ids)
+                if len(records) == len(ids):
+                    self.query_hits += 1
+                    return records
+
+            if use_index:
+                # 只用有效期内抓取的记录回答，过期的记录需要重新向 arXiv 查询
+                records = self._search_index(conn, query, n, max_age=self.query_ttl)
+                if len(records) >= n:
+                    self.index_hits += 1
+                    return records
+
+            self.misses += 1
+            return None
+
+    def search_index(self, query: str, n: int, max_age: float | None = None) -> list[dict]:
+        """
+        Full-text search over the stored records, best match first. With
+        `max_age`, only records fetched within the last max_age seconds count.
+        """
+        with self._lock:
+            return self._search_index(self._connect(), query, n, max_age)
+
+    def _search_index(self, conn: sqlite3.Connection, query: str, n: int, max_age: float | None) -> list[dict]:
+        words = re.findall(r"\w+", query.lower())
+        if not self.has_fts or not words:
+            return []
+        match = " ".join(f'"{w}"' for w in dict.fromkeys(words))
+        min_fetched_at = time.time() - max_age if max_age is not None else 0
+        ids = [
+            r["paper_id"] for r in conn.execute(
+                "SELECT papers_fts.paper_id FROM papers_fts JOIN papers USING (paper_id) "
+                "WHERE papers_fts MATCH ? AND papers.fetched_at >= ? "
+                "ORDER BY bm25(papers_fts) LIMIT ?",
+                (match, min_fetched_at, n),
+            )
+        ]
+        return self._fetch(conn, ids)
+
+    @staticmethod
+    def _fetch(conn: sqlite3.Connection, ids: list[str]) -> list[dict]:
+        if not ids:
+            return []
+        rows = {
+            r["paper_id"]: dict(r) for r in conn.execute(
+                f"SELECT * FROM papers WHERE paper_id IN ({','.join('?' * len(ids))})", ids
+            )
+        }
+        return [rows[i] for i in ids if i in rows]
@@ -0,0 +1,126 @@
+from AutoReview_workflow import AutoReview_workflow, run_workflows
+from main import add_run_args, build_input_string, configure_run
+from rate_limit import ConcurrencyLimit
+from types import SimpleNamespace
+from dotenv import load_dotenv
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+
+load_dotenv()
+api_key = os.getenv('api_key')
+
+# 任务文件中未给出的字段使用与 main.py 相同的默认值
+JOB_DEFAULTS = {
+    "min_citations": 0,
+    "max_citations": 5,
+    "max_length": 5000,
+    "year_range": "2020-2025",
+    "max_iter": 5,
+}
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="AutoReview batch runner: one review job per topic")
+    parser.add_argument('--jobs', type=str, required=True, help='CSV or JSONL file with one job per row; "topic" is required')
+    parser.add_argument('--batch_dir', type=str, default='./batch_runs', help='Directory that receives one workdir per job')
+    parser.add_argument('--max_jobs', type=int, default=2, help='Jobs running at the same time')
+    parser.add_argument('--llm_concurrency', type=int, default=4, help='Maximum in-flight LLM requests across all jobs')
+    parser.add_argument('--max_iter', type=int, default=None, help='Default max_iter for jobs that do not set one')
+    add_run_args(parser)
+    # 批量运行时 arXiv 并发默认受限；缓存默认放在 batch_dir 下，由所有任务共享
+    parser.set_defaults(arxiv_concurrency=2)
+    args = parser.parse_args()
+    if args.stream:
+        parser.error("--stream is not supported by batch.py: jobs run on the async runtime, which does not stream")
+    return args
+
+
+def load_jobs(path: str) -> list[dict]:
+    """
+    Read jobs from a CSV (with header) or JSONL file. Every job needs a
+    "topic"; other fields (max_iter, year_range, min_citations, max_citations,
+    max_length, name) are optional.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = [dict(row) for row in csv.DictReader(f)]
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    jobs = []
+    for number, row in enumerate(rows, start=1):
+        row = {k: v for k, v in row.items() if v not in (None, "")}
+        if not row.get("topic"):
+            raise ValueError(f"job {number} in {path} has no topic")
+        jobs.append(row)
+    return jobs
+
+
+def job_workdir(batch_dir: str, number: int, job: dict) -> str:
+    slug = re.sub(r"[^\w]+", "_", job.get("name") or job["topic"]).strip("_").lower()[:40]
+    return os.path.join(batch_dir, f"{number:03d}_{slug}")
+
+
+def build_job(number: int, job: dict, args, llm_limit: ConcurrencyLimit) -> AutoReview_workflow:
+    settings = {**JOB_DEFAULTS, **({"max_iter": args.max_iter} if args.max_iter else {}), **job}
+    workdir = job_workdir(args.batch_dir, number, job)
+    os.makedirs(workdir, exist_ok=True)
+    return AutoReview_workflow(build_input_string(SimpleNamespace(**settings)), topic = job["topic"],
+                               api_key = api_key, workdir = workdir, max_iter = int(settings["max_iter"]),
+                               parallel_tools = args.parallel_tools, model_timeout = args.model_timeout,
+                               tool_timeout = args.tool_timeout, llm_cache = args.llm_cache,
+                               digest_papers = not args.no_digest, digest_workers = args.digest_workers,
+                               llm_limit = llm_limit, resume = args.resume)
+
+
+def run_batch(args) -> list[dict]:
+    """
+    Run all jobs on one event loop (run_workflows), with at most args.max_jobs
+    at a time: while one job waits for the model or a tool, the others keep
+    going, without a thread per job. The LLM and arXiv caps, the arXiv rate
+    limit and the HTTP connection pool are global; the PDF text, arXiv
+    metadata, paper and digest caches are shared by all jobs.
+    """
+    jobs = load_jobs(args.jobs)
+    configure_run(args, args.batch_dir)
+    llm_limit = ConcurrencyLimit(args.llm_concurrency)
+
+    results, workflows = [], []
+    for number, job in enumerate(jobs, start=1):
+        result = {"job": number, "topic": job["topic"], "workdir": job_workdir(args.batch_dir, number, job)}
+        try:
+            workflows.append((result, build_job(number, job, args, llm_limit)))
+        except Exception as e:
+            result.update(status = "failed", error = str(e), elapsed_s = 0.0)
+        results.append(result)
+
+    outcomes = asyncio.run(run_workflows([review for _, review in workflows], max_concurrent = args.max_jobs,
+                                         return_exceptions = True))
+    for (result, review), outcome in zip(workflows, outcomes):
+        if isinstance(outcome, BaseException):
+            result.update(status = "failed", error = str(outcome))
+        else:
+            result.update(status = "done", score = review.read_score())
+        result["elapsed_s"] = round(review.elapsed_s or 0.0, 1)
+
+    os.makedirs(args.batch_dir, exist_ok=True)
+    summary_path = os.path.join(args.batch_dir, "summary.jsonl")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    print("\n========== Batch summary ==========")
+    for r in results:
+        outcome = f"score {r['score']}" if r["status"] == "done" else f"FAILED: {r['error']}"
+        print(f"[{r['job']:03d}] {r['topic'][:50]:<50} {outcome} ({r['elapsed_s']} s) -> {r['workdir']}")
+    print(f"\n任务汇总：{summary_path}")
+    return results
+
+
+if __name__ == '__main__':
+    run_batch(parse_args())
@@ -0,0 +1,139 @@
+"""
+Offline throughput benchmark for AutoReview_workflow.
+
+Swaps the OpenAI clients of every agent for a scripted mock LLM and the arXiv
+tools for a mock that serves generated fixture PDFs, then runs the real
+workflow, tools and PDF pipeline in a temporary directory. No API key or network
+access is needed.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_workflow --iterations 3 --llm_latency 0.5 --arxiv_latency 0.2
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools
+from AutoReview_workflow import AutoReview_workflow
+from state_store import state_store_for
+from workspace import cache_path, set_cache_dir
+from model_backends import ModelEndpoint, ModelRoute
+from benchmarks.mock_arxiv import MockArxivSearch
+from benchmarks.mock_llm import MockAsyncOpenAI, MockOpenAI, ScriptedPolicy
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline AutoReview workflow benchmark")
+    parser.add_argument('--iterations', type=int, default=3, help='Workflow iterations to run')
+    parser.add_argument('--papers', type=int, default=5, help='Papers downloaded by the mock LitRetr agent')
+    parser.add_argument('--pages', type=int, default=12, help='Pages per fixture PDF')
+    parser.add_argument('--llm_latency', type=float, default=0.5, help='Seconds per mock model call')
+    parser.add_argument('--token_delay', type=float, default=0.01, help='Seconds between streamed chunks')
+    parser.add_argument('--arxiv_latency', type=float, default=0.2, help='Seconds per mock arXiv search/download')
+    parser.add_argument('--parallel_tools', action='store_true', help='Run independent tool calls concurrently')
+    parser.add_argument('--stream', action='store_true', help='Use streaming model calls')
+    parser.add_argument('--json', type=str, default=None, help='Write the report to this JSON file')
+    return parser.parse_args()
+
+
+def install_mock_arxiv(mock: MockArxivSearch) -> dict:
+    """把 ALL_TOOLS 中的 arXiv 工具替换为 mock，返回原始函数以便恢复"""
+    original = {}
+    for name in ("find_papers_by_str", "retrieve_full_paper", "retrieve_full_papers"):
+        original[name] = tools.ALL_TOOLS[name]["func"]
+        tools.ALL_TOOLS[name]["func"] = getattr(mock, name)
+    return original
+
+
+def run_benchmark(args) -> dict:
+    root = tempfile.mkdtemp(prefix="autoreview_bench_")
+    cwd = os.getcwd()
+    os.chdir(root)
+    # 共享缓存也放在临时目录中，不写入调用者的 workdir/.cache
+    previous_cache_dir = cache_path()
+    set_cache_dir(os.path.join(root, "workdir", ".cache"))
+
+    mock_arxiv = MockArxivSearch(latency=args.arxiv_latency, pages=args.pages)
+    original_tools = install_mock_arxiv(mock_arxiv)
+    try:
+        state_store_for("workdir").update("LitRetr", enabled=True, input="LLM-based agents")
+
+        workflow = AutoReview_workflow(
+            "Please write a literature review on the topic: 'LLM-based Agent'.",
+            topic="LLM-based Agent", api_key="mock", workdir="workdir",
+            max_iter=args.iterations, parallel_tools=args.parallel_tools,
+            stream=args.stream,
+        )
+        policy = ScriptedPolicy(workdir="workdir", papers=args.papers)
+        mock_route = ModelRoute("bench", [ModelEndpoint(
+            "mock", client=MockOpenAI(policy, args.llm_latency, args.token_delay),
+            async_client=MockAsyncOpenAI(policy, args.llm_latency, args.token_delay),
+        )])
+        for agent in (workflow.GradStu, workflow.LitRetr, workflow.Professor):
+            agent.route = mock_route
+        workflow.digester.route = mock_route
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        workflow.run()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        iterations = max(e["iteration"] or 0 for e in workflow.metrics.events)
+        return {
+            "config": vars(args),
+            "workdir": root,
+            "elapsed_s": elapsed,
+            "iterations": iterations,
+            "iterations_per_minute": iterations / elapsed * 60 if elapsed else 0.0,
+            "python_peak_mb": peak / 1024 / 1024,
+            "max_rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024) if resource else None,
+            "arxiv_searches": mock_arxiv.searches,
+            "arxiv_downloads": mock_arxiv.downloads,
+            "by_agent": workflow.metrics.summary("agent"),
+            "by_tool": workflow.metrics.summary("tool"),
+            "by_iteration": workflow.metrics.summary("iteration"),
+            "tables": {by: workflow.metrics.format_summary(by) for by in ("agent", "tool", "iteration")},
+        }
+    finally:
+        for name, func in original_tools.items():
+            tools.ALL_TOOLS[name]["func"] = func
+        set_cache_dir(previous_cache_dir)
+        os.chdir(cwd)
+
+
+def main():
+    args = parse_args()
+    report = run_benchmark(args)
+
+    print("\n========== Benchmark report ==========")
+    print(f"Iterations:             {report['iterations']}")
+    print(f"Elapsed:                {report['elapsed_s']:.2f} s")
+    print(f"Iterations per minute:  {report['iterations_per_minute']:.2f}")
+    print(f"Python peak memory:     {report['python_peak_mb']:.1f} MB")
+    if report["max_rss_mb"] is not None:
+        print(f"Max RSS:                {report['max_rss_mb']:.1f} MB")
+    print(f"arXiv searches/downloads: {report['arxiv_searches']}/{report['arxiv_downloads']}")
+    for by, table in report["tables"].items():
+        print(f"\n--- Latency by {by} ---\n{table}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
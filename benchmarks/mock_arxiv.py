@@ -0,0 +1,101 @@
+import os
+import time
+
+from tools import ArxivSearch
+
+LOREM = (
+    "Large language model agents combine planning, memory and tool use to solve "
+    "multi-step tasks. We evaluate retrieval augmented agents on literature review "
+    "benchmarks and report accuracy, latency and cost across model sizes. "
+)
+
+
+def make_pdf(pages: list[str]) -> bytes:
+    """
+    Build a minimal, valid PDF with one Helvetica text line per page line.
+    Good enough for pypdf text extraction; no external dependency needed.
+    """
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # 占位，pages 对象生成后回填
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for text in pages:
+        lines = [text[i:i + 90] for i in range(0, len(text), 90)] or [""]
+        ops = ["BT", "/F1 10 Tf", "14 TL", "50 800 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_obj, font, content)
+        ))
+
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+class MockArxivSearch(ArxivSearch):
+    """
+    Stand-in for ArxivSearch that never touches the network.
+    Searches return fixture summaries and downloads write generated PDFs,
+    each after a configurable latency.
+    """
+
+    def __init__(self, latency: float = 0.2, pages: int = 12):
+        self.latency = latency
+        self.pages = pages
+        self.searches = 0
+        self.downloads = 0
+
+    def fixture_ids(self, N: int) -> list[str]:
+        return [f"2401.{10000 + i:05d}" for i in range(N)]
+
+    def find_papers_by_str(self, query: str, N: int = 5) -> str:
+        time.sleep(self.latency)
+        self.searches += 1
+        return "\n".join(
+            f"# Mock paper {paper_id} on {query[:60]}\n\n"
+            f"**Publication Date:** 2024-01-01\n\n"
+            f"**arXiv ID:** {paper_id}\n\n"
+            f"**Summary:**\n{LOREM}\n\n---\n"
+            for paper_id in self.fixture_ids(N)
+        )
+
+    def retrieve_full_paper(self, paper_id: str) -> str:
+        time.sleep(self.latency)
+        self.downloads += 1
+        filepath = self._paper_path(paper_id)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        pages = [f"Paper {paper_id} page {n}. " + LOREM * 6 for n in range(1, self.pages + 1)]
+        with open(filepath, "wb") as f:
+            f.write(make_pdf(pages))
+        return filepath
+
+    def retrieve_full_papers(self, paper_ids: list[str], max_workers: int | None = None) -> str:
+        return "\n".join(f"- {paper_id}: {self.retrieve_full_paper(paper_id)}" for paper_id in paper_ids)
@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import json
+import threading
+import os
+import time
+from types import SimpleNamespace
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from workspace import current_workdir
+
+
+class ScriptedPolicy:
+    """
+    Decide the next assistant message for each agent role from the tools it
+    was offered, the tool calls already made in the current run and the files
+    in the workdir. It drives one full GradStu -> LitRetr -> Professor round
+    per workflow iteration.
+    """
+
+    def __init__(self, workdir: str | None = None, papers: int = 5, review_chars: int = 8000):
+        self.workdir = workdir
+        self.papers = papers
+        self.review_chars = review_chars
+        self.review_version = 0
+        self.comment_version = 0
+
+    def _files(self, subdir: str) -> list[str]:
+        # 未指定 workdir 时使用当前任务的 workdir（批量模式）
+        path = os.path.join(self.workdir or current_workdir(), subdir)
+        if not os.path.isdir(path):
+            return []
+        return sorted(os.path.join(path, f) for f in os.listdir(path))
+
+    def next_message(self, request: dict) -> dict:
+        tools = {t["function"]["name"] for t in request.get("tools") or []}
+        messages = request["messages"]
+        last_user = max(i for i, m in enumerate(messages) if m["role"] == "user")
+        done = [
+            tc["function"]["name"]
+            for m in messages[last_user + 1:]
+            for tc in m.get("tool_calls") or []
+        ]
+
+        if request.get("response_format", {}).get("type") == "json_object":
+            return self._digest(messages)
+        if "save_review" in tools:
+            return self._grad_stu(done)
+        if "find_papers_by_str" in tools:
+            return self._lit_retr(done)
+        if "save_score" in tools:
+            return self._professor(done)
+        return {"content": "OK"}
+
+    def _digest(self, messages: list[dict]) -> dict:
+        paper = messages[-1]["content"][:60]
+        return {"content": json.dumps({
+            "title": f"Mock digest of {paper}",
+            "method": "Retrieval augmented planning agent.",
+            "dataset": "Literature review benchmark.",
+            "results": "Higher accuracy at lower latency.",
+            "limitations": "Evaluated on a single domain.",
+        })}
+
+    def _grad_stu(self, done: list[str]) -> dict:
+        papers = [p for p in self._files("retrieve_result") if p.endswith(".pdf")]
+        if not papers:
+            if "save_retrieval_request" in done:
+                return {"content": "Waiting for the Literature Retrieval Agent."}
+            return _calls(("save_retrieval_request", {"enabled": True, "input_text": "LLM-based agents"}))
+        if "read_digests" not in done:
+            return _calls(("read_digests", {}))
+        if "read_literatures" not in done:
+            return _calls(("read_literatures", {"filepaths": papers, "max_chars_per_file": 8000}))
+        if "save_review" not in done:
+            self.review_version += 1
+            content = "# Mock review\n\n" + "Agents plan, remember and act. " * (self.review_chars // 31)
+            return _calls(("save_review", {"content": content, "version": self.review_version}))
+        return {"content": f"Draft version {self.review_version} saved."}
+
+    def _lit_retr(self, done: list[str]) -> dict:
+        if "find_papers_by_str" not in done:
+            return _calls(("find_papers_by_str", {"query": "LLM-based agents", "N": self.papers}))
+        if "retrieve_full_paper" not in done:
+            ids = [f"2401.{10000 + i:05d}" for i in range(self.papers)]
+            return _calls(*[("retrieve_full_paper", {"paper_id": paper_id}) for paper_id in ids])
+        return {"content": f"Downloaded {self.papers} papers."}
+
+    def _professor(self, done: list[str]) -> dict:
+        reviews = self._files("reviews")
+        if "read_review" not in done and reviews:
+            return _calls(("read_review", {"filepath": reviews[-1]}))
+        if "save_score" not in done:
+            self.comment_version += 1
+            return _calls(
+                ("save_comment", {"content": "Expand the comparison section.", "version": self.comment_version}),
+                ("save_score", {"score": 60}),
+            )
+        return {"content": "Review finished."}
+
+
+def _calls(*calls) -> dict:
+    return {
+        "content": None,
+        "tool_calls": [
+            {
+                "id": f"call_{time.perf_counter_ns()}_{i}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args, ensure_ascii=False)},
+            }
+            for i, (name, args) in enumerate(calls)
+        ],
+    }
+
+
+class MockPrefixCache:
+    """
+    Imitates a provider-side prefix cache: the leading messages of a request
+    (together with its tool schemas) that some earlier request started with
+    count as cached, like DeepSeek's prompt_cache_hit_tokens.
+    """
+
+    def __init__(self):
+        self._seen: set[str] = set()
+        self._lock = threading.Lock()
+
+    def hit_chars(self, request: dict) -> int:
+        prefix = hashlib.sha256(json.dumps(request.get("tools"), sort_keys=True).encode("utf-8"))
+        hit, chars = True, 0
+        with self._lock:
+            for message in request["messages"]:
+                text = json.dumps(message, ensure_ascii=False, default=str)
+                prefix.update(text.encode("utf-8"))
+                key = prefix.hexdigest()
+                if hit and key in self._seen:
+                    chars += len(text)
+                else:
+                    hit = False
+                    self._seen.add(key)
+        return chars
+
+
+# 所有模拟客户端共享，相当于同一个服务端
+provider_prefix_cache = MockPrefixCache()
+
+
+class _MockCompletions:
+    def __init__(self, policy: ScriptedPolicy, latency: float, token_delay: float):
+        self.policy = policy
+        self.latency = latency
+        self.token_delay = token_delay
+        self.calls = 0
+
+    def _completion(self, request: dict) -> dict:
+        self.calls += 1
+        message = self.policy.next_message(request)
+        prompt_chars = sum(len(json.dumps(m, ensure_ascii=False, default=str)) for m in request["messages"])
+        cached_chars = provider_prefix_cache.hit_chars(request)
+        completion_chars = len(json.dumps(message, ensure_ascii=False))
+        return {
+            "id": f"mock-{self.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                "message": {"role": "assistant", "content": None, "tool_calls": None, **message},
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "prompt_cache_hit_tokens": cached_chars // 4,
+                "prompt_cache_miss_tokens": (prompt_chars - cached_chars) // 4,
+                "completion_tokens": completion_chars // 4,
+                "total_tokens": (prompt_chars + completion_chars) // 4,
+            },
+        }
+
+    def _chunks(self, data: dict):
+        base = {"id": data["id"], "object": "chat.completion.chunk",
+                "created": data["created"], "model": data["model"]}
+        message = data["choices"][0]["message"]
+
+        content = message.get("content") or ""
+        for i in range(0, len(content), 16):
+            time.sleep(self.token_delay)
+            yield ChatCompletionChunk.model_validate({**base, "choices": [
+                {"index": 0, "delta": {"content": content[i:i + 16]}}]})
+        for index, tool_call in enumerate(message.get("tool_calls") or []):
+            time.sleep(self.token_delay)
+            yield ChatCompletionChunk.model_validate({**base, "choices": [
+                {"index": 0, "delta": {"tool_calls": [{"index": index, **tool_call}]}}]})
+        yield ChatCompletionChunk.model_validate({**base, "choices": [], "usage": data["usage"]})
+
+    def create(self, **request):
+        time.sleep(self.latency)
+        data = self._completion(request)
+        if request.get("stream"):
+            return self._chunks(data)
+        return ChatCompletion.model_validate(data)
+
+
+class _MockAsyncCompletions(_MockCompletions):
+    async def create(self, **request):
+        await asyncio.sleep(self.latency)
+        return ChatCompletion.model_validate(self._completion(request))
+
+
+class MockOpenAI:
+    """
+    Drop-in replacement for the OpenAI client used by BaseAgent. It answers
+    with ScriptedPolicy after `latency` seconds and streams chunks
+    `token_delay` seconds apart.
+    """
+
+    def __init__(self, policy: ScriptedPolicy, latency: float = 0.5, token_delay: float = 0.01):
+        self.chat = SimpleNamespace(completions=_MockCompletions(policy, latency, token_delay))
+
+
+class MockAsyncOpenAI:
+    def __init__(self, policy: ScriptedPolicy, latency: float = 0.5, token_delay: float = 0.01):
+        self.chat = SimpleNamespace(completions=_MockAsyncCompletions(policy, latency, token_delay))
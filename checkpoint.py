@@ -0,0 +1,42 @@
+import json
+import os
+import threading
+import time
+
+CHECKPOINT_VERSION = 1
+
+
+class Checkpoint:
+    """
+    Durable snapshot of a workflow run, rewritten atomically after every agent
+    turn: each agent's history and step number, the iteration and score, and
+    the agent runs that were still queued or in flight. The workflow restores
+    it on `--resume`. Completed turns are not repeated; runs that were in
+    flight start again from their beginning.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> dict | None:
+        if not self.exists():
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CHECKPOINT_VERSION:
+            print(f"忽略不兼容的检查点：{self.path}")
+            return None
+        return data
+
+    def save(self, data: dict) -> None:
+        data = {"version": CHECKPOINT_VERSION, "saved_at": time.time(), **data}
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
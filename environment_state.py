@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+
+# 目录 mtime 精度有限：刚修改过的目录在这段时间内总是重新扫描
+MTIME_GRACE = 2.0
+
+
+class EnvironmentState:
+    """
+    Shared view of the workdir sub-directories the agents perceive.
+
+    Directory listings are cached and only re-read when the directory's mtime
+    changes (entries created, deleted or renamed), so perceiving the environment
+    on every model step costs one stat() per directory. Each observer (agent)
+    also gets the delta since the last listing that actually reached its
+    prompt, e.g. the papers that were downloaded since then: describe() only
+    stages the listing, mark_seen() commits it once the prompt is built.
+    """
+
+    def __init__(self, workdir: str, max_listed: int = 30):
+        self.workdir = workdir
+        self.max_listed = max_listed
+        self.scans = 0
+        self.hits = 0
+
+        self._lock = threading.Lock()
+        self._listings: dict[str, tuple[int, list[str], dict]] = {}   # subdir -> (mtime_ns, names, 文件 mtime)
+        self._seen: dict[tuple[str, str], set[str]] = {}         # (observer, subdir) -> names
+        self._staged: dict[tuple[str, str], set[str]] = {}       # 已描述但尚未写入提示词的列表
+
+    def _path(self, subdir: str) -> str:
+        return os.path.join(self.workdir, subdir)
+
+    def names(self, subdir: str) -> list[str]:
+        """
+        Sorted file names in a workdir sub-directory (created if missing).
+        """
+        path = self._path(subdir)
+        with self._lock:
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                os.makedirs(path, exist_ok=True)
+                mtime_ns = os.stat(path).st_mtime_ns
+
+            cached = self._listings.get(subdir)
+            recent = time.time() - mtime_ns / 1e9 < MTIME_GRACE
+            if cached and cached[0] == mtime_ns and not recent:
+                self.hits += 1
+                return cached[1]
+
+            with os.scandir(path) as entries:
+                mtimes = {e.name: e.stat().st_mtime_ns for e in entries if e.is_file()}
+            names = sorted(mtimes)
+            self._listings[subdir] = (mtime_ns, names, mtimes)
+            self.scans += 1
+            return names
+
+    def newest(self, subdir: str, n: int) -> list[str]:
+        """
+        The n most recently modified files of `subdir` (as of its last scan),
+        in name order.
+        """
+        names = self.names(subdir)
+        if len(names) <= n:
+            return names
+        with self._lock:
+            mtimes = self._listings[subdir][2]
+        newest = set(sorted(names, key=lambda name: (mtimes.get(name, 0), name))[-n:])
+        return [name for name in names if name in newest]
+
+    def files(self, subdir: str) -> list[str]:
+        return [os.path.join(self._path(subdir), name) for name in self.names(subdir)]
+
+    def delta(self, observer: str, subdir: str, names: list[str] | None = None) -> tuple[list[str], list[str]]:
+        """
+        Names added to and removed from `subdir` since the listing last
+        committed with mark_seen(). The current listing is staged for the
+        next mark_seen().
+        """
+        if names is None:
+            names = self.names(subdir)
+        key = (observer, subdir)
+        with self._lock:
+            seen = self._seen.get(key)
+            self._staged[key] = set(names)
+        if seen is None:
+            return [], []
+        return [n for n in names if n not in seen], sorted(seen.difference(names))
+
+    def mark_seen(self, observer: str) -> None:
+        """Commit the listings staged by `observer` once they were rendered into a prompt."""
+        with self._lock:
+            for key in [k for k in self._staged if k[0] == observer]:
+                self._seen[key] = self._staged.pop(key)
+
+    def describe(self, observer: str, subdir: str, noun: str = "files") -> str:
+        """
+        Compact, prompt-ready description of a sub-directory: the directory,
+        the file count, the `max_listed` most recently modified files (pointing to the
+        list_files tool for the rest) and what changed since the listing the
+        observer last saw in a prompt.
+        """
+        names = self.names(subdir)
+        added, removed = self.delta(observer, subdir, names)
+        if not names:
+            text = f"no {noun} in {self._path(subdir)}"
+        else:
+            listed = self.newest(subdir, self.max_listed)
+            hidden = len(names) - len(listed)
+            more = (f" (+{hidden} more not listed; call list_files with subdir=\"{subdir}\" to see all)"
+                    if hidden else "")
+            text = f"{len(names)} {noun} in {self._path(subdir)}: {', '.join(listed)}{more}"
+        if added:
+            text += f"; {len(added)} new since your last turn: {', '.join(added)}"
+        if removed:
+            text += f"; {len(removed)} removed since your last turn: {', '.join(removed)}"
+        return text
@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import defaultdict
+
+from workspace import current_workdir
+
+# 工具发布的事件类型
+RETRIEVAL_REQUESTED = "retrieval_requested"
+PAPERS_RETRIEVED = "papers_retrieved"
+DRAFT_SAVED = "draft_saved"
+COMMENT_SAVED = "comment_saved"
+SCORE_SAVED = "score_saved"
+
+
+class EventBus:
+    """
+    Minimal thread-safe publish/subscribe bus.
+
+    Tools publish an event after they changed the shared state (a draft was
+    saved, a retrieval was requested, ...). Handlers are called synchronously
+    in the publishing thread, so they should only hand the event over (e.g. put
+    it on a queue) and return. Subscribing to "*" receives every event.
+    Every event carries the workdir of the job that published it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, list] = defaultdict(list)
+
+    def subscribe(self, event_type: str, handler) -> None:
+        with self._lock:
+            self._subscribers[event_type].append(handler)
+
+    def unsubscribe(self, event_type: str, handler) -> None:
+        with self._lock:
+            if handler in self._subscribers.get(event_type, []):
+                self._subscribers[event_type].remove(handler)
+
+    def publish(self, event_type: str, **payload) -> dict:
+        event = {"type": event_type, "ts": time.time(), "workdir": current_workdir(), **payload}
+        with self._lock:
+            handlers = self._subscribers.get(event_type, []) + self._subscribers.get("*", [])
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"事件处理失败 {event_type}: {e}")
+        return event
+
+
+# 进程内共享的事件总线，工具与 workflow 都通过它通信
+event_bus = EventBus()
@@ -0,0 +1,136 @@
+import asyncio
+import atexit
+import threading
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+try:  # HTTP/2 需要可选依赖 h2（pip install "httpx[http2]"）
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_BASE_URL = "https://api.deepseek.com"
+
+# 连接池与超时的默认值，可通过 http_clients.configure() 修改
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE = 10
+KEEPALIVE_EXPIRY = 60.0
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 120.0
+DOWNLOAD_TIMEOUT = 60.0
+
+
+class HttpClients:
+    """
+    Process-wide registry of pooled HTTP clients.
+
+    All agents of all jobs share one OpenAI client per (base_url, api_key),
+    built on a single keep-alive connection pool, so a new agent or job reuses
+    warm TLS connections instead of opening its own. The SDK's own retries are
+    off; each model endpoint's ModelCallGuard retries model calls. arXiv PDF downloads go
+    through a separate pooled client. HTTP/2 is used when h2 is installed.
+    An httpx async pool cannot outlive its event loop, so async clients are
+    kept per running loop: a second asyncio.run() (a later batch job, a resume
+    after an async run) gets fresh clients, and those of a finished loop are
+    dropped with it. run_workflows() closes them with aclose().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.max_connections = MAX_CONNECTIONS
+        self.max_keepalive = MAX_KEEPALIVE
+        self.connect_timeout = CONNECT_TIMEOUT
+        self.read_timeout = READ_TIMEOUT
+        self.download_timeout = DOWNLOAD_TIMEOUT
+        self.http2 = HTTP2_AVAILABLE
+        self._http = None
+        self._download = None
+        self._openai: dict[tuple, OpenAI] = {}
+        # 事件循环 -> (httpx.AsyncClient, {(base_url, api_key): AsyncOpenAI})
+        self._async: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def configure(self, max_connections: int | None = None, max_keepalive: int | None = None,
+                  connect_timeout: float | None = None, read_timeout: float | None = None,
+                  download_timeout: float | None = None, http2: bool | None = None) -> None:
+        """Change pool limits / timeouts; takes effect for clients created afterwards."""
+        with self._lock:
+            if max_connections is not None:
+                self.max_connections = max_connections
+            if max_keepalive is not None:
+                self.max_keepalive = max_keepalive
+            if connect_timeout is not None:
+                self.connect_timeout = connect_timeout
+            if read_timeout is not None:
+                self.read_timeout = read_timeout
+            if download_timeout is not None:
+                self.download_timeout = download_timeout
+            if http2 is not None:
+                self.http2 = http2 and HTTP2_AVAILABLE
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive,
+                            keepalive_expiry=KEEPALIVE_EXPIRY)
+
+    def _timeout(self, read: float) -> httpx.Timeout:
+        return httpx.Timeout(read, connect=self.connect_timeout)
+
+    def openai(self, api_key: str | None, base_url: str = DEFAULT_BASE_URL) -> OpenAI:
+        key = (base_url, api_key)
+        with self._lock:
+            if key not in self._openai:
+                if self._http is None:
+                    self._http = DefaultHttpxClient(limits=self._limits(), timeout=self._timeout(self.read_timeout),
+                                                    http2=self.http2)
+                self._openai[key] = OpenAI(api_key=api_key, base_url=base_url, http_client=self._http,
+                                            max_retries=0)
+            return self._openai[key]
+
+    def async_openai(self, api_key: str | None, base_url: str = DEFAULT_BASE_URL) -> AsyncOpenAI:
+        """AsyncOpenAI client for the running event loop; call it from inside a coroutine."""
+        loop = asyncio.get_running_loop()
+        key = (base_url, api_key)
+        with self._lock:
+            # 已结束的事件循环：其连接池不能再用，直接丢弃（客户端可能反向引用循环，弱引用不会自动释放）
+            for closed in [l for l in self._async if l.is_closed()]:
+                del self._async[closed]
+            if loop not in self._async:
+                http = DefaultAsyncHttpxClient(limits=self._limits(), timeout=self._timeout(self.read_timeout),
+                                               http2=self.http2)
+                self._async[loop] = (http, {})
+            http, clients = self._async[loop]
+            if key not in clients:
+                clients[key] = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http, max_retries=0)
+            return clients[key]
+
+    async def aclose(self) -> None:
+        """Close the async clients of the running event loop."""
+        with self._lock:
+            entry = self._async.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].aclose()
+
+    def download_client(self) -> httpx.Client:
+        """Pooled client for arXiv PDF downloads (follows redirects)."""
+        with self._lock:
+            if self._download is None:
+                self._download = httpx.Client(limits=self._limits(), timeout=self._timeout(self.download_timeout),
+                                              http2=self.http2, follow_redirects=True)
+            return self._download
+
+    def close(self) -> None:
+        with self._lock:
+            for client in (self._http, self._download):
+                if client is not None:
+                    client.close()
+            self._http = self._download = None
+            self._openai.clear()
+            self._async.clear()
+
+
+# 进程内共享的 HTTP 客户端
+http_clients = HttpClients()
+atexit.register(http_clients.close)
@@ -0,0 +1,236 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from workspace import cache_path
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # 未安装时只使用 BM25
+    np = None
+    SentenceTransformer = None
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+CHUNK_CHARS = 1200
+CHUNK_OVERLAP = 200
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def chunk_page(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """
+    Split one page into overlapping chunks, breaking on whitespace where possible.
+    """
+    text = " ".join(text.split())
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            space = text.rfind(" ", start + size // 2, end)
+            end = space if space > 0 else end
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+class LiteratureIndex:
+    """
+    Persistent passage index over the downloaded papers.
+
+    Papers are split into page-aligned chunks and ranked with BM25. When
+    sentence-transformers is installed, chunks are also embedded with a small
+    CPU model and both rankings are merged with reciprocal rank fusion. The
+    index is stored under `index_dir` and refreshed incrementally: only papers
+    whose content key changed are re-chunked.
+
+    `page_reader(path)` yields (page_number, text) pairs and `key_func(path)`
+    returns a content key for a file; tools.py wires both to the PDF text cache.
+    """
+
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    RRF_K = 60
+
+    def __init__(self, page_reader, key_func, index_dir: str | None = None,
+                 use_embeddings: bool = True):
+        self.page_reader = page_reader
+        self.key_func = key_func
+        self.index_dir = index_dir or cache_path("literature_index")
+        self.use_embeddings = use_embeddings and SentenceTransformer is not None
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._model = None
+        self.docs: dict[str, str] = {}      # path -> content key
+        self.chunks: list[dict] = []        # {"path", "page", "text"}
+        self.embeddings = None              # np.ndarray, 与 chunks 一一对应
+        self._tf: list[Counter] = []
+        self._df: Counter = Counter()
+        self._avg_len = 0.0
+
+    # --- persistence ---
+    def _index_path(self) -> str:
+        return os.path.join(self.index_dir, "index.json")
+
+    def _embeddings_path(self) -> str:
+        return os.path.join(self.index_dir, "embeddings.npy")
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self._index_path()):
+            return
+        with open(self._index_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.docs = data.get("docs", {})
+        self.chunks = data.get("chunks", [])
+        if (self.use_embeddings and data.get("embedding_model") == EMBEDDING_MODEL
+                and os.path.exists(self._embeddings_path())):
+            embeddings = np.load(self._embeddings_path())
+            if len(embeddings) == len(self.chunks):
+                self.embeddings = embeddings
+        self._rebuild_stats()
+
+    def _save(self) -> None:
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "docs": self.docs,
+                "chunks": self.chunks,
+                "embedding_model": EMBEDDING_MODEL if self.embeddings is not None else None,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self._index_path())
+        if self.embeddings is not None:
+            tmp_path = self._embeddings_path() + ".tmp.npy"
+            np.save(tmp_path, self.embeddings)
+            os.replace(tmp_path, self._embeddings_path())
+
+    # --- indexing ---
+    def _rebuild_stats(self) -> None:
+        self._tf = [Counter(tokenize(c["text"])) for c in self.chunks]
+        self._df = Counter()
+        for tf in self._tf:
+            self._df.update(tf.keys())
+        total = sum(sum(tf.values()) for tf in self._tf)
+        self._avg_len = total / len(self._tf) if self._tf else 0.0
+
+    def _embed(self, texts: list[str]):
+        if self._model is None:
+            self._model = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+        return self._model.encode(texts, batch_size=32, normalize_embeddings=True,
+                                  show_progress_bar=False).astype("float32")
+
+    def refresh(self, paths: list[str]) -> int:
+        """
+        Bring the index in line with `paths`: index new or changed papers and
+        drop papers that are gone. Returns the number of papers (re)indexed.
+        """
+        with self._lock:
+            self._load()
+            wanted = {}
+            for path in paths:
+                try:
+                    wanted[path] = self.key_func(path)
+                except OSError:
+                    continue
+
+            stale = {p for p, key in self.docs.items() if wanted.get(p) != key}
+            new = [p for p, key in wanted.items() if self.docs.get(p) != key]
+            if not stale and not new:
+                return 0
+
+            keep = [i for i, c in enumerate(self.chunks) if c["path"] not in stale]
+            self.chunks = [self.chunks[i] for i in keep]
+            if self.embeddings is not None:
+                self.embeddings = self.embeddings[keep]
+            for path in stale:
+                self.docs.pop(path, None)
+
+            added = []
+            indexed = 0
+            for path in new:
+                try:
+                    pages = list(self.page_reader(path))
+                except Exception as e:
+                    print(f"文献索引跳过 {path}: {e}")
+                    continue
+                for page_number, text in pages:
+                    added += [{"path": path, "page": page_number, "text": chunk}
+                              for chunk in chunk_page(text)]
+                self.docs[path] = wanted[path]
+                indexed += 1
+
+            if self.use_embeddings:
+                if self.embeddings is None and self.chunks:
+                    # 旧索引没有向量（或模型变了），整体补算一次
+                    added = self.chunks + added
+                    self.chunks = []
+                if added:
+                    vectors = self._embed([c["text"] for c in added])
+                    self.embeddings = vectors if self.embeddings is None else np.vstack([self.embeddings, vectors])
+            self.chunks += added
+
+            self._rebuild_stats()
+            self._save()
+            return indexed
+
+    # --- search ---
+    def _bm25_ranking(self, query: str) -> list[tuple[int, float]]:
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self._df]
+        n = len(self.chunks)
+        scores = []
+        for i, tf in enumerate(self._tf):
+            length = sum(tf.values())
+            score = 0.0
+            for t in terms:
+                f = tf.get(t)
+                if not f:
+                    continue
+                idf = math.log(1 + (n - self._df[t] + 0.5) / (self._df[t] + 0.5))
+                norm = f + self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * length / (self._avg_len or 1))
+                score += idf * f * (self.BM25_K1 + 1) / norm
+            if score > 0:
+                scores.append((i, score))
+        return sorted(scores, key=lambda x: -x[1])
+
+    def _embedding_ranking(self, query: str) -> list[tuple[int, float]]:
+        similarities = self.embeddings @ self._embed([query])[0]
+        order = np.argsort(-similarities)
+        return [(int(i), float(similarities[i])) for i in order]
+
+    def search(self, query: str, k: int = 5) -> list[dict]:
+        """
+        Return the k most relevant chunks as dicts with path, page, text and score.
+        """
+        with self._lock:
+            self._load()
+            if not self.chunks:
+                return []
+
+            rankings = [self._bm25_ranking(query)]
+            if self.use_embeddings and self.embeddings is not None:
+                rankings.append(self._embedding_ranking(query)[:max(50, k * 5)])
+
+            if len(rankings) == 1:
+                ranked = rankings[0][:k]
+            else:
+                # 倒数排名融合 BM25 与向量检索
+                fused = Counter()
+                for ranking in rankings:
+                    for rank, (i, _) in enumerate(ranking):
+                        fused[i] += 1.0 / (self.RRF_K + rank + 1)
+                ranked = fused.most_common(k)
+
+            return [{**self.chunks[i], "score": score} for i, score in ranked]
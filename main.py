@@ -1,4 +1,9 @@
 from AutoReview_workflow import AutoReview_workflow
+from tools import ARXIV_RATE, PDF_READ_TIMEOUT, arxiv_limiter, arxiv_slots, pdf_reader_pool
+from http_clients import DOWNLOAD_TIMEOUT, MAX_CONNECTIONS, READ_TIMEOUT, http_clients
+from resilience import model_guard
+from model_backends import model_router
+from workspace import set_cache_dir
 import argparse
 from dotenv import load_dotenv
 import os
@@ -6,6 +11,41 @@ import os
 load_dotenv()
 api_key = os.getenv('api_key')
 
+def add_run_args(parser):
+    """Options shared by main.py and batch.py (how each run talks to models, arXiv and caches)."""
+    parser.add_argument('--parallel_tools', action='store_true', help='Run independent tool calls of one model turn concurrently')
+    parser.add_argument('--stream', action='store_true', help='Stream model output and start tools as soon as their arguments are complete')
+    parser.add_argument('--arxiv_rate', type=float, default=ARXIV_RATE, help='Maximum arXiv requests per second')
+    parser.add_argument('--arxiv_concurrency', type=int, default=None, help='Maximum in-flight arXiv requests (default: unlimited)')
+    parser.add_argument('--llm_cache', type=str, default='passthrough', choices=['passthrough', 'record', 'replay'],
+                        help='LLM response cache mode: record responses, replay them offline, or bypass the cache')
+    parser.add_argument('--models', type=str, default=None, help='JSON file with model endpoints and per-agent routes (default: deepseek-chat for every agent)')
+    parser.add_argument('--model_retries', type=int, default=model_guard.max_attempts, help='Attempts per model call on timeouts, 429 and 5xx errors')
+    parser.add_argument('--model_timeout', type=float, default=None, help='Timeout (seconds) of one model request attempt (default: --http_timeout)')
+    parser.add_argument('--tool_timeout', type=float, default=None, help='Timeout (seconds) of one tool call; the model is told the tool timed out (default: none)')
+    parser.add_argument('--http_max_connections', type=int, default=MAX_CONNECTIONS, help='Size of the shared HTTP connection pool')
+    parser.add_argument('--http_timeout', type=float, default=READ_TIMEOUT, help='Read timeout (seconds) of model API requests')
+    parser.add_argument('--download_timeout', type=float, default=DOWNLOAD_TIMEOUT, help='Read timeout (seconds) of arXiv PDF downloads')
+    parser.add_argument('--pdf_read_timeout', type=float, default=PDF_READ_TIMEOUT, help='Time limit (seconds) for extracting one batch of papers in read_literatures')
+    parser.add_argument('--cache_dir', type=str, default=None, help='Directory of the shared PDF text, arXiv, paper and digest caches (default: .cache in the work directory)')
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint in the work directory')
+    parser.add_argument('--no_digest', action='store_true', help='Skip the per-paper summarization stage between retrieval and writing')
+    parser.add_argument('--digest_workers', type=int, default=4, help='Papers summarized at the same time')
+
+
+def configure_run(args, work_dir):
+    """Apply the process-wide options of add_run_args; caches default to work_dir/.cache."""
+    set_cache_dir(args.cache_dir or os.path.join(work_dir, ".cache"))
+    arxiv_limiter.configure(rate=args.arxiv_rate)
+    arxiv_slots.configure(args.arxiv_concurrency)
+    http_clients.configure(max_connections=args.http_max_connections, read_timeout=args.http_timeout,
+                           download_timeout=args.download_timeout)
+    pdf_reader_pool.configure(timeout=args.pdf_read_timeout)
+    model_guard.configure(max_attempts=args.model_retries)
+    if args.models:
+        model_router.load(args.models)
+
+
 def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description="AutoReview Workflow Runner")
@@ -17,6 +57,7 @@ def parse_args():
     parser.add_argument('--work_dir', type=str, default='./workdir', help='Working directory for saving outputs and logs')
     parser.add_argument('--human_feedback', type=bool, default=False, help='Is human feedback required?')
     parser.add_argument('--max_iter', type=int, default=5, help='max_iter')
+    add_run_args(parser)
     return parser.parse_args()
 
 
@@ -35,11 +76,14 @@ def build_input_string(args):
 
 if __name__ == '__main__':
     args = parse_args()
+    configure_run(args, args.work_dir)
 
     # Build input string for the workflow
     input_str = build_input_string(args)
     
-    review = AutoReview_workflow(input_str, topic = args.topic, api_key = api_key, workdir = args.work_dir, max_iter = args.max_iter)
+    review = AutoReview_workflow(input_str, topic = args.topic, api_key = api_key, workdir = args.work_dir, max_iter = args.max_iter, parallel_tools = args.parallel_tools,
+                                 model_timeout = args.model_timeout, tool_timeout = args.tool_timeout, stream = args.stream, llm_cache = args.llm_cache,
+                                 digest_papers = not args.no_digest, digest_workers = args.digest_workers, resume = args.resume)
 
     review.run()
     # review.test_Agent()
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+
+def cached_prompt_tokens(usage) -> int | None:
+    """
+    Prompt tokens served from the provider's prefix cache: DeepSeek reports
+    `prompt_cache_hit_tokens`, OpenAI `prompt_tokens_details.cached_tokens`.
+    """
+    hit = getattr(usage, "prompt_cache_hit_tokens", None)
+    if hit is None:
+        hit = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    return hit
+
+
+class MetricsRecorder:
+    """
+    Collect timing and token events from agents and tools.
+
+    Every event is a flat dict with a `kind` ("model_call", "tool_call",
+    "step", or "prompt" for the size and compaction of each step's prompt),
+    the agent name, the workflow iteration and event-specific
+    fields. Events are kept in memory. When `path` is set, each one is also
+    appended to that JSONL file as it happens.
+    """
+
+    # 汇总表中按 kind 累加的数值字段
+    SUMMED_FIELDS = {
+        "model_call": ("latency", "prompt_tokens", "completion_tokens", "cached_tokens"),
+        "tool_call": ("duration", "result_chars"),
+        "step": ("wall_time",),
+        "prompt": ("prompt_chars", "prompt_tokens", "elided", "elided_tokens"),
+    }
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.events: list[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, agent: str, iteration=None, **fields) -> dict:
+        event = {"ts": time.time(), "kind": kind, "agent": agent, "iteration": iteration, **fields}
+        with self._lock:
+            self.events.append(event)
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        return event
+
+    def export_jsonl(self, path: str) -> str:
+        with self._lock:
+            events = list(self.events)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        return path
+
+    def summary(self, by: str = "agent") -> dict:
+        """
+        Aggregate events by "agent", "iteration" or "tool".
+        Returns {group: {"<kind>.count": n, "<kind>.<field>": total, ...}},
+        plus "model_call.cache_hit_rate" (% of prompt tokens served from the
+        provider's prefix cache).
+        """
+        with self._lock:
+            events = list(self.events)
+
+        result = defaultdict(lambda: defaultdict(float))
+        for event in events:
+            if by == "tool" and event["kind"] != "tool_call":
+                continue
+            group = event.get(by)
+            row = result[group]
+            row[f"{event['kind']}.count"] += 1
+            for field in self.SUMMED_FIELDS.get(event["kind"], ()):
+                row[f"{event['kind']}.{field}"] += event.get(field) or 0
+        for row in result.values():
+            if row.get("model_call.prompt_tokens"):
+                row["model_call.cache_hit_rate"] = 100 * row["model_call.cached_tokens"] / row["model_call.prompt_tokens"]
+        return {k: dict(v) for k, v in result.items()}
+
+    def format_summary(self, by: str = "agent") -> str:
+        """
+        Render summary(by) as a plain-text table.
+        """
+        columns = [
+            ("steps", "step.count", "{:.0f}"),
+            ("step s", "step.wall_time", "{:.1f}"),
+            ("model calls", "model_call.count", "{:.0f}"),
+            ("model s", "model_call.latency", "{:.1f}"),
+            ("prompt tok", "model_call.prompt_tokens", "{:.0f}"),
+            ("compl tok", "model_call.completion_tokens", "{:.0f}"),
+            ("cached tok", "model_call.cached_tokens", "{:.0f}"),
+            ("cache hit %", "model_call.cache_hit_rate", "{:.0f}"),
+            ("elided tok", "prompt.elided_tokens", "{:.0f}"),
+            ("tool calls", "tool_call.count", "{:.0f}"),
+            ("tool s", "tool_call.duration", "{:.1f}"),
+            ("tool chars", "tool_call.result_chars", "{:.0f}"),
+        ]
+        if by == "tool":
+            columns = [c for c in columns if c[1].startswith("tool_call.")]
+        rows = [[str(group)] + [fmt.format(values.get(key, 0)) for _, key, fmt in columns]
+                for group, values in sorted(self.summary(by).items(), key=lambda kv: str(kv[0]))]
+        header = [by] + [name for name, _, _ in columns]
+        widths = [max(len(r[i]) for r in rows + [header]) for i in range(len(header))]
+
+        lines = [" | ".join(h.ljust(w) for h, w in zip(header, widths)),
+                 "-+-".join("-" * w for w in widths)]
+        lines += [" | ".join(c.ljust(w) for c, w in zip(r, widths)) for r in rows]
+        return "\n".join(lines)
@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+from http_clients import DEFAULT_BASE_URL, http_clients
+from rate_limit import http_status
+from resilience import CircuitBreaker, CircuitOpenError, ModelCallGuard, is_retryable, model_guard
+
+DEFAULT_MODEL = "deepseek-chat"
+# 响应变慢的端点降级多久（秒），之后再试探一次
+DEGRADED_COOLDOWN = 60.0
+# 延迟滑动平均的平滑系数
+LATENCY_ALPHA = 0.3
+
+# 未提供模型配置时：所有角色都使用 DeepSeek
+DEFAULT_CONFIG = {
+    "endpoints": {"deepseek": {"base_url": DEFAULT_BASE_URL, "model": DEFAULT_MODEL}},
+    "routes": {"default": ["deepseek"]},
+}
+
+
+class ModelEndpoint:
+    """
+    One OpenAI-compatible model: its base_url, model name and API key.
+
+    Each endpoint has its own ModelCallGuard (retries and circuit breaker)
+    and an exponentially weighted latency average. When that average
+    exceeds `max_latency`, the endpoint counts as degraded for
+    DEGRADED_COOLDOWN seconds and routes try their fallbacks first.
+    """
+
+    def __init__(self, name: str, model: str = DEFAULT_MODEL, base_url: str = DEFAULT_BASE_URL,
+                 api_key: str | None = None, max_latency: float | None = None,
+                 max_attempts: int | None = None, client=None, async_client=None):
+        self.name = name
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_latency = max_latency
+        # 重试与熔断参数取自 resilience.model_guard 的设置
+        self.guard = ModelCallGuard(
+            max_attempts=max_attempts or model_guard.max_attempts,
+            breaker=CircuitBreaker(model_guard.breaker.failure_threshold, model_guard.breaker.reset_timeout),
+        )
+        self.latency = None
+        self.degraded_until = 0.0
+        self._client = client
+        self._async_client = async_client
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self._client or http_clients.openai(self.api_key, self.base_url)
+
+    @property
+    def async_client(self):
+        return self._async_client or http_clients.async_openai(self.api_key, self.base_url)
+
+    def healthy(self) -> bool:
+        return not self.guard.breaker.is_open() and time.monotonic() >= self.degraded_until
+
+    def observe_latency(self, seconds: float) -> None:
+        with self._lock:
+            self.latency = seconds if self.latency is None else (
+                LATENCY_ALPHA * seconds + (1 - LATENCY_ALPHA) * self.latency
+            )
+            if self.max_latency is not None and self.latency > self.max_latency:
+                # 降级期结束后重新统计延迟
+                self.degraded_until = time.monotonic() + DEGRADED_COOLDOWN
+                self.latency = None
+                self.guard.count("degraded")
+                print(f"模型端点 {self.name} 响应过慢（>{self.max_latency}s），暂时优先使用备用端点")
+
+    def stats(self) -> dict:
+        return {**self.guard.stats(), "latency": self.latency, "healthy": self.healthy()}
+
+
+def should_fall_back(error: Exception) -> bool:
+    """Errors after which the next endpoint is tried; a rejected request (400/422) is not one of them."""
+    if isinstance(error, CircuitOpenError) or is_retryable(error):
+        return True
+    return http_status(error) in (401, 403, 404)
+
+
+class ModelRoute:
+    """
+    The ordered endpoints (primary first, then fallbacks) that serve one agent
+    role. Healthy endpoints are tried in configured order, degraded ones or
+    ones with an open circuit only as a last resort. A call moves on to the
+    next endpoint when the current one fails after its own retries.
+    """
+
+    def __init__(self, role: str, endpoints: list[ModelEndpoint]):
+        if not endpoints:
+            raise ValueError(f"no model endpoint configured for {role}")
+        self.role = role
+        self.endpoints = endpoints
+
+    @property
+    def primary(self) -> ModelEndpoint:
+        return self.endpoints[0]
+
+    def candidates(self) -> list[ModelEndpoint]:
+        healthy = [e for e in self.endpoints if e.healthy()]
+        return healthy + [e for e in self.endpoints if e not in healthy]
+
+    def _fall_back(self, endpoint: ModelEndpoint, error: Exception, remaining: list) -> bool:
+        if not remaining or not should_fall_back(error):
+            return False
+        endpoint.guard.count("fallbacks")
+        print(f"{self.role}: 模型端点 {endpoint.name} 调用失败（{type(error).__name__}），改用 {remaining[0].name}")
+        return True
+
+    def call(self, request, *args, limit=None, **kwargs):
+        """
+        Return request(endpoint, *args, **kwargs) from the first endpoint that
+        succeeds. `limit` (e.g. the global LLM ConcurrencyLimit) is held per
+        attempt, so neither backoff nor waiting for a slot counts as latency.
+        """
+        def attempt(endpoint):
+            with limit or nullcontext():
+                start = time.perf_counter()
+                result = request(endpoint, *args, **kwargs)
+                endpoint.observe_latency(time.perf_counter() - start)
+            return result
+
+        candidates = self.candidates()
+        for i, endpoint in enumerate(candidates):
+            try:
+                return endpoint.guard.call(attempt, endpoint)
+            except Exception as e:
+                if not self._fall_back(endpoint, e, candidates[i + 1:]):
+                    raise
+
+    async def acall(self, request, *args, limit=None, timeout: float | None = None, **kwargs):
+        async def attempt(endpoint):
+            async with limit or nullcontext():
+                start = time.perf_counter()
+                result = await request(endpoint, *args, **kwargs)
+                endpoint.observe_latency(time.perf_counter() - start)
+            return result
+
+        candidates = self.candidates()
+        for i, endpoint in enumerate(candidates):
+            try:
+                return await endpoint.guard.acall(attempt, endpoint, timeout=timeout)
+            except Exception as e:
+                if not self._fall_back(endpoint, e, candidates[i + 1:]):
+                    raise
+
+
+class ModelRouter:
+    """
+    Process-wide mapping from agent role (class name such as "LitRetrAgent",
+    "ProfessorAgent" or "PaperDigester") to a ModelRoute.
+
+    The configuration names the endpoints once and lists, per role, the
+    endpoints to use in order; roles without an entry use "default":
+
+        {
+          "endpoints": {
+            "deepseek": {"base_url": "https://api.deepseek.com", "model": "deepseek-chat"},
+            "reasoner": {"base_url": "https://api.deepseek.com", "model": "deepseek-reasoner",
+                         "max_latency": 120},
+            "local":    {"base_url": "http://localhost:8000/v1", "model": "qwen2.5-7b-instruct",
+                         "api_key": "EMPTY"}
+          },
+          "routes": {
+            "default": ["deepseek"],
+            "LitRetrAgent": ["local", "deepseek"],
+            "ProfessorAgent": ["reasoner", "deepseek"]
+          }
+        }
+
+    An endpoint's key comes from "api_key", else from the environment
+    variable named by "api_key_env", else it is the key the agent was created
+    with. Endpoints, and with them their health, are shared by all agents and
+    jobs that use the same key.
+    """
+
+    def __init__(self, config: dict | None = None):
+        self._lock = threading.Lock()
+        self._endpoints: dict[tuple, ModelEndpoint] = {}
+        self.configure(config or DEFAULT_CONFIG)
+
+    def configure(self, config: dict) -> None:
+        routes = config.get("routes") or {}
+        endpoints = config.get("endpoints") or {}
+        for role, names in routes.items():
+            for name in names:
+                if name not in endpoints:
+                    raise ValueError(f"route {role} uses unknown model endpoint {name}")
+        if "default" not in routes:
+            raise ValueError("model config needs a default route")
+        with self._lock:
+            self.config = config
+            self._endpoints.clear()
+
+    def load(self, path: str) -> None:
+        with open(path, "r", encoding="utf-8") as f:
+            self.configure(json.load(f))
+
+    def endpoint(self, name: str, api_key: str | None = None) -> ModelEndpoint:
+        spec = self.config["endpoints"][name]
+        key = spec.get("api_key") or os.getenv(spec.get("api_key_env") or "") or api_key
+        with self._lock:
+            if (name, key) not in self._endpoints:
+                self._endpoints[(name, key)] = ModelEndpoint(
+                    name, model=spec.get("model", DEFAULT_MODEL), base_url=spec.get("base_url", DEFAULT_BASE_URL),
+                    api_key=key, max_latency=spec.get("max_latency"), max_attempts=spec.get("max_attempts"),
+                )
+            return self._endpoints[(name, key)]
+
+    def route(self, role: str, api_key: str | None = None) -> ModelRoute:
+        routes = self.config["routes"]
+        names = routes.get(role) or routes["default"]
+        return ModelRoute(role, [self.endpoint(name, api_key) for name in names])
+
+    def stats(self) -> dict:
+        with self._lock:
+            endpoints = list(self._endpoints.values())
+        return {endpoint.name: endpoint.stats() for endpoint in endpoints}
+
+
+# 进程内共享的模型路由；main.py / batch.py 通过 --models 加载配置
+model_router = ModelRouter()
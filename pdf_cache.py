@@ -0,0 +1,199 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from workspace import cache_path
+
+# 提取逻辑变化时递增，旧缓存自动失效
+EXTRACTOR_VERSION = "pypdf-1"
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def file_digest(filepath: str) -> str:
+    """
+    Compute the SHA-256 digest of a file, reading it in chunks.
+    """
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PdfTextCache:
+    """
+    Persistent on-disk cache of extracted PDF text.
+
+    Entries are keyed by the extractor version and the SHA-256 of the file
+    content, so renamed or re-downloaded copies of the same paper share one
+    entry. Text is stored per page, so a partial read only caches the pages
+    it actually extracted. Whole documents are evicted in least-recently-used
+    order once the cache grows past `max_bytes`.
+    """
+
+    def __init__(self, path: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        # 未指定时使用 workspace 中配置的缓存目录（打开时才解析）
+        self._path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._conn_path = None
+        # (abspath, size, mtime_ns) -> digest，避免对未修改的文件重复计算哈希
+        self._digest_memo: dict[tuple, str] = {}
+
+    @property
+    def path(self) -> str:
+        return self._path or cache_path("pdf_text.sqlite3")
+
+    def _connect(self) -> sqlite3.Connection:
+        # 进程池 fork 出的子进程不能复用父进程的连接
+        if self._conn is not None and self._pid == os.getpid() and self._conn_path == self.path:
+            return self._conn
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_key     TEXT PRIMARY KEY,
+                num_pages   INTEGER,
+                total_bytes INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                doc_key     TEXT NOT NULL,
+                page_number INTEGER NOT NULL,
+                text        TEXT NOT NULL,
+                PRIMARY KEY (doc_key, page_number)
+            );
+            """
+        )
+        self._conn = conn
+        self._pid = os.getpid()
+        self._conn_path = self.path
+        return conn
+
+    def doc_key(self, filepath: str) -> str:
+        """
+        Return the cache key of a PDF file (extractor version + content hash).
+        """
+        st = os.stat(filepath)
+        memo_key = (os.path.abspath(filepath), st.st_size, st.st_mtime_ns)
+        digest = self._digest_memo.get(memo_key)
+        if digest is None:
+            digest = file_digest(filepath)
+            self._digest_memo[memo_key] = digest
+        return f"{EXTRACTOR_VERSION}:{digest}"
+
+    def get_num_pages(self, doc_key: str) -> int | None:
+        """
+        Return the page count of a cached document and mark it as recently used.
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT num_pages FROM documents WHERE doc_key = ?", (doc_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute(
+                    "UPDATE documents SET last_access = ? WHERE doc_key = ?",
+                    (time.time(), doc_key),
+                )
+            return row[0]
+
+    def set_num_pages(self, doc_key: str, num_pages: int) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO documents (doc_key, num_pages, last_access) VALUES (?, ?, ?) "
+                    "ON CONFLICT(doc_key) DO UPDATE SET num_pages = excluded.num_pages",
+                    (doc_key, num_pages, time.time()),
+                )
+
+    def get_page(self, doc_key: str, page_number: int) -> str | None:
+        """
+        Return the cached text of one page, or None on a miss.
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT text FROM pages WHERE doc_key = ? AND page_number = ?",
+                (doc_key, page_number),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put_page(self, doc_key: str, page_number: int, text: str) -> None:
+        """
+        Store the extracted text of one page.
+        """
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO documents (doc_key, last_access) VALUES (?, ?) "
+                    "ON CONFLICT(doc_key) DO UPDATE SET last_access = excluded.last_access",
+                    (doc_key, time.time()),
+                )
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO pages (doc_key, page_number, text) VALUES (?, ?, ?)",
+                    (doc_key, page_number, text),
+                )
+                if cur.rowcount:
+                    conn.execute(
+                        "UPDATE documents SET total_bytes = total_bytes + ? WHERE doc_key = ?",
+                        (size, doc_key),
+                    )
+            self._evict(conn, keep=doc_key)
+
+    def _evict(self, conn: sqlite3.Connection, keep: str) -> None:
+        (used,) = conn.execute("SELECT COALESCE(SUM(total_bytes), 0) FROM documents").fetchone()
+        if used <= self.max_bytes:
+            return
+
+        victims = []
+        for doc_key, size in conn.execute(
+            "SELECT doc_key, total_bytes FROM documents WHERE doc_key != ? ORDER BY last_access ASC",
+            (keep,),
+        ):
+            if used <= self.max_bytes:
+                break
+            victims.append(doc_key)
+            used -= size
+
+        with conn:
+            conn.executemany("DELETE FROM pages WHERE doc_key = ?", [(k,) for k in victims])
+            conn.executemany("DELETE FROM documents WHERE doc_key = ?", [(k,) for k in victims])
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss counters and the current cache size.
+        """
+        with self._lock:
+            conn = self._connect()
+            docs, used = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(total_bytes), 0) FROM documents"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "documents": docs,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+
+    Tokens refill at `rate` per second up to `capacity`. acquire() only waits
+    when a request would exceed the limit. penalize() reacts to throttling
+    responses (HTTP 429/503): it blocks every caller for the server's
+    Retry-After or an exponentially growing backoff. reward() resets the
+    backoff once a request succeeds.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, max_backoff: float = 60.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._penalties = 0
+
+    def configure(self, rate: float | None = None, capacity: float | None = None) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            if rate is not None:
+                self.rate = rate
+            if capacity is not None:
+                self.capacity = capacity
+                self._tokens = min(self._tokens, capacity)
+
+    def _refill(self, now: float) -> None:
+        # 退避期间 _last 被推到未来，此时不补充令牌
+        if now > self._last:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take `tokens` from the bucket, sleeping only as long as needed.
+        Returns the number of seconds waited.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = max(self._blocked_until - now, (tokens - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self, retry_after: float | None = None) -> float:
+        """
+        Back off after a throttling response. Honors `retry_after` when given,
+        otherwise doubles the backoff on each consecutive penalty.
+        Returns the backoff applied.
+        """
+        with self._lock:
+            self._penalties += 1
+            if retry_after is None:
+                retry_after = min(self.max_backoff, (1.0 / self.rate) * 2 ** self._penalties)
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            # 等待期间不累积令牌，恢复后按正常速率发送
+            self._tokens = 0.0
+            self._last = max(now, self._blocked_until)
+            return retry_after
+
+    def reward(self) -> None:
+        with self._lock:
+            self._penalties = 0
+
+
+class ConcurrencyLimit:
+    """
+    Process-wide cap on concurrent operations (e.g. in-flight LLM requests of
+    all batch jobs). Use it with `with` in threads or `async with` in
+    coroutines. `limit=None` means unlimited; configure() may change the limit
+    at any time.
+    """
+
+    def __init__(self, limit: int | None = None):
+        self.limit = limit
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def configure(self, limit: int | None) -> None:
+        with self._cond:
+            self.limit = limit
+            self._cond.notify_all()
+
+    def _available(self) -> bool:
+        return self.limit is None or self.active < self.limit
+
+    def acquire(self) -> None:
+        with self._cond:
+            self._cond.wait_for(self._available)
+            self.active += 1
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if not self._available():
+                return False
+            self.active += 1
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        # 轮询而不是占用线程等待，协程被取消时不会泄漏名额
+        while not self.try_acquire():
+            await asyncio.sleep(0.05)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+def http_status(error: Exception) -> int | None:
+    """
+    Return the HTTP status carried by an exception from arxiv, urllib or httpx.
+    """
+    for attr in ("status", "code", "status_code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """
+    Parse a numeric Retry-After header from an HTTP exception, if present.
+    """
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
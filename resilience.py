@@ -0,0 +1,179 @@
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+
+import openai
+
+from rate_limit import http_status, retry_after_seconds
+
+# 可重试的 HTTP 状态码：超时、冲突、限流与服务端错误
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model API while the circuit breaker is open."""
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, asyncio.TimeoutError, TimeoutError)):
+        return True
+    return http_status(error) in RETRYABLE_STATUSES
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an endpoint is down. After `failure_threshold` consecutive
+    failed calls the circuit opens and every call is rejected for
+    `reset_timeout` seconds. Then a single trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            # half_open 时已有一个试探请求在进行；它若未返回结果（如被取消），超时后再放行一个
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        """True while calls are being rejected (does not start a half-open trial)."""
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self) -> bool:
+        """Count a failed call; returns True when this failure opened the circuit."""
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                opened = self.state != "open"
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                return opened
+            return False
+
+
+class ModelCallGuard:
+    """
+    Retry, timeout and circuit-breaker wrapper around model API requests.
+
+    Retryable errors (timeouts, connection errors, 408/409/429/5xx) are retried
+    up to `max_attempts` times, waiting for the server's Retry-After or a
+    jittered exponential backoff. Every attempt first asks the circuit
+    breaker, so callers fail fast with CircuitOpenError while the endpoint is
+    down. `counters` counts calls, retries, timeouts, failures, circuit
+    rejections and openings, and malformed tool arguments reported by agents.
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                 breaker: CircuitBreaker | None = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def configure(self, max_attempts: int | None = None, failure_threshold: int | None = None,
+                  reset_timeout: float | None = None) -> None:
+        if max_attempts is not None:
+            self.max_attempts = max_attempts
+        if failure_threshold is not None:
+            self.breaker.failure_threshold = failure_threshold
+        if reset_timeout is not None:
+            self.breaker.reset_timeout = reset_timeout
+
+    def count(self, event: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[event] += n
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # full jitter：在 [0, base * 2^attempt] 内随机等待，避免多个任务同时重试
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _before_attempt(self) -> None:
+        if not self.breaker.allow():
+            self.count("circuit_rejected")
+            raise CircuitOpenError(f"model API circuit is open, retry after {self.breaker.reset_timeout}s")
+        self.count("attempts")
+
+    def _after_failure(self, attempt: int, error: Exception) -> float | None:
+        """Record a failed attempt; returns the delay before the next one, or None to give up."""
+        if isinstance(error, (openai.APITimeoutError, asyncio.TimeoutError, TimeoutError)):
+            self.count("timeouts")
+        retryable = is_retryable(error)
+        if not retryable:
+            # 请求本身有误（如 400），说明服务可用
+            self.breaker.record_success()
+        elif self.breaker.record_failure():
+            self.count("circuit_opened")
+            print(f"模型 API 连续失败，熔断 {self.breaker.reset_timeout} 秒")
+        if not retryable or attempt == self.max_attempts:
+            self.count("failures")
+            return None
+        self.count("retries")
+        delay = self.backoff(attempt, error)
+        print(f"模型调用失败（{type(error).__name__}: {error}），{delay:.1f} 秒后第 {attempt + 1} 次尝试")
+        return delay
+
+    def call(self, fn, *args, **kwargs):
+        self.count("calls")
+        for attempt in range(1, self.max_attempts + 1):
+            self._before_attempt()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._after_failure(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, fn, *args, timeout: float | None = None, **kwargs):
+        """Async call(); `timeout` bounds each attempt, not the retries as a whole."""
+        self.count("calls")
+        for attempt in range(1, self.max_attempts + 1):
+            self._before_attempt()
+            try:
+                result = await asyncio.wait_for(fn(*args, **kwargs), timeout=timeout)
+            except Exception as e:
+                delay = self._after_failure(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+
+# 进程内共享的默认设置与计数器，本身不包裹任何请求：每个模型端点
+# （model_backends.ModelEndpoint）创建时按它的重试次数与熔断参数生成自己的 guard；
+# 它只额外统计无效的工具参数（bad_tool_arguments）
+model_guard = ModelCallGuard()
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from workspace import submit_in_context
+
+# 调度器内部事件：某个 Agent 的一次运行开始 / 结束
+AGENT_STARTED = "agent_started"
+AGENT_FINISHED = "agent_finished"
+
+
+class AgentScheduler:
+    """
+    Event-driven scheduler for the agents of one workflow.
+
+    Every agent is an actor that runs at most once at a time. Different actors
+    run concurrently. Events published on the bus are queued and handed to the
+    routes registered with `on()` in a single dispatcher thread. A route
+    reacts by calling `schedule()`. A run requested for a busy actor waits in
+    that actor's pending list; identical pending requests are coalesced, but
+    a request that arrives while the same run is in progress queues one
+    follow-up run (the running one may have missed what triggered it).
+
+    With `workdir` set, only bus events published by that job are handled, so
+    several workflows can share one bus.
+
+    The scheduler stops when `stop()` was called and the running actors have
+    finished, or when no actor is running and nothing is pending.
+    """
+
+    def __init__(self, bus, max_workers: int = 3, workdir: str | None = None):
+        self.bus = bus
+        self.max_workers = max_workers
+        self.workdir = os.path.abspath(workdir) if workdir else None
+
+        self._actors: dict[str, dict] = {}
+        self._routes: dict[str, list] = {}
+        self._running: dict[str, str] = {}          # actor -> input of the current run
+        self._pending: dict[str, list[str]] = {}
+        self._failed: dict[str, list[str]] = {}    # 失败的运行，检查点中保留以便恢复时重试
+        self._post = None
+        self.stop_reason: str | None = None
+        self.error: BaseException | None = None
+
+    def register(self, name: str, func=None, afunc=None) -> None:
+        """
+        Register an actor: `func(user_input)` is used by run(), the coroutine
+        function `afunc(user_input)` by arun().
+        """
+        self._actors[name] = {"func": func, "afunc": afunc}
+        self._pending[name] = []
+        self._failed[name] = []
+
+    def on(self, event_type: str, route) -> None:
+        """Call `route(event)` in the dispatcher whenever `event_type` is seen."""
+        self._routes.setdefault(event_type, []).append(route)
+
+    def is_busy(self, name: str) -> bool:
+        return name in self._running or bool(self._pending[name])
+
+    def schedule(self, name: str, user_input: str = "") -> bool:
+        """
+        Queue a run of an actor. Returns False when the same request is
+        already pending, or the scheduler is stopping.
+        """
+        if self.stop_reason is not None:
+            return False
+        if user_input in self._pending[name]:
+            return False
+        self._pending[name].append(user_input)
+        return True
+
+    def notify(self, event_type: str, **payload) -> None:
+        """Queue an event for this scheduler only, without publishing it on the bus."""
+        self._post({"type": event_type, **payload})
+
+    def queued_runs(self) -> dict[str, list[str]]:
+        """
+        Inputs of the runs not yet completed, per actor: failed runs first,
+        then the one in flight, then the pending ones. Used for checkpoints.
+        """
+        return {
+            name: self._failed[name] + ([self._running[name]] if name in self._running else []) + list(pending)
+            for name, pending in self._pending.items()
+        }
+
+    def stop(self, reason: str) -> None:
+        if self.stop_reason is None:
+            self.stop_reason = reason
+
+    # --- dispatch ---
+    def _on_bus_event(self, event: dict) -> None:
+        # 可能在任意工具线程中被调用，只做入队
+        if self.workdir and os.path.abspath(event.get("workdir") or "") != self.workdir:
+            return
+        if self._post is not None:
+            self._post(event)
+
+    def _dispatch(self, event: dict) -> None:
+        if event["type"] == AGENT_FINISHED:
+            self._running.pop(event["agent"], None)
+            if event.get("error") is not None:
+                self._failed[event["agent"]].append(event["input"])
+                if self.error is None:
+                    self.error = event["error"]
+                    self.stop(f"{event['agent']} failed: {event['error']}")
+        for route in self._routes.get(event["type"], []):
+            route(event)
+
+    def _ready(self) -> list[tuple[str, str]]:
+        if self.stop_reason is not None:
+            return []
+        started = []
+        for name, pending in self._pending.items():
+            if pending and name not in self._running:
+                user_input = pending.pop(0)
+                self._running[name] = user_input
+                started.append((name, user_input))
+                self._dispatch({"type": AGENT_STARTED, "agent": name, "input": user_input})
+        return started
+
+    def _done(self) -> bool:
+        if self._running:
+            return False
+        if self.stop_reason is None and not any(self._pending.values()):
+            self.stop_reason = "No pending work, stopping process."
+        return self.stop_reason is not None
+
+    def run(self) -> str:
+        """Drive the actors with worker threads until the scheduler stops."""
+        events = queue.Queue()
+        self._post = events.put
+        self.bus.subscribe("*", self._on_bus_event)
+
+        def run_actor(name, user_input):
+            error = None
+            try:
+                self._actors[name]["func"](user_input)
+            except Exception as e:
+                error = e
+            events.put({"type": AGENT_FINISHED, "agent": name, "input": user_input, "error": error})
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                while True:
+                    for name, user_input in self._ready():
+                        submit_in_context(pool, run_actor, name, user_input)
+                    if self._done():
+                        break
+                    self._dispatch(events.get())
+        finally:
+            self.bus.unsubscribe("*", self._on_bus_event)
+            self._post = None
+
+        if self.error is not None:
+            raise self.error
+        return self.stop_reason
+
+    async def arun(self) -> str:
+        """Async counterpart of run(): actors are tasks on the running event loop."""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        self._post = lambda event: loop.call_soon_threadsafe(events.put_nowait, event)
+        self.bus.subscribe("*", self._on_bus_event)
+
+        async def run_actor(name, user_input):
+            error = None
+            try:
+                await self._actors[name]["afunc"](user_input)
+            except Exception as e:
+                error = e
+            # 与总线事件走同一入口，保证先处理运行期间发布的事件
+            self._post({"type": AGENT_FINISHED, "agent": name, "input": user_input, "error": error})
+
+        tasks = set()
+        try:
+            while True:
+                for name, user_input in self._ready():
+                    task = asyncio.create_task(run_actor(name, user_input))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if self._done():
+                    break
+                self._dispatch(await events.get())
+        finally:
+            self.bus.unsubscribe("*", self._on_bus_event)
+            self._post = None
+
+        if self.error is not None:
+            raise self.error
+        return self.stop_reason
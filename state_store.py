@@ -0,0 +1,123 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_STATE_PATH = os.path.join("workdir", "state.sqlite3")
+
+
+class StateStore:
+    """
+    Shared workflow state (retrieval request, Professor score, ...) in SQLite.
+
+    Every entry is a JSON value under a section key such as "LitRetr" or
+    "Professor". WAL mode lets readers run while a writer commits. `update()`
+    merges fields inside one write transaction, so agents and tools that run in
+    parallel never overwrite each other's sections. A legacy
+    workdir/config.json is imported once when the store is created.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS state (
+                key        TEXT PRIMARY KEY,
+                value      TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn = conn
+        self._pid = os.getpid()
+        self._import_legacy(conn)
+        return conn
+
+    def _import_legacy(self, conn: sqlite3.Connection) -> None:
+        legacy_path = os.path.join(os.path.dirname(self.path) or ".", "config.json")
+        if not os.path.exists(legacy_path):
+            return
+        if conn.execute("SELECT 1 FROM state LIMIT 1").fetchone():
+            return
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        # 旧版 config.json 只导入一次
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, value in legacy.items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO state (key, value, updated_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), time.time()),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            row = self._connect().execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO state (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+
+    def update(self, key: str, **fields) -> dict:
+        """
+        Atomically merge `fields` into the dict stored under `key` and return it.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+                value = {**(json.loads(row[0]) if row else {}), **fields}
+                conn.execute(
+                    "INSERT OR REPLACE INTO state (key, value, updated_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), time.time()),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            rows = self._connect().execute("SELECT key, value FROM state").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+
+_stores: dict[str, StateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def state_store_for(workdir: str) -> StateStore:
+    """
+    The StateStore of a workdir; one instance per directory, shared by all
+    tools and agents of the job running there.
+    """
+    path = os.path.abspath(os.path.join(workdir, "state.sqlite3"))
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = StateStore(path)
+        return _stores[path]
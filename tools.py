@@ -1,38 +1,43 @@
 import arxiv
-import time
 import os
 from pypdf import PdfReader
-import ssl, certifi, urllib.request
-from Agents.LitRetrAgent import LitRetrAgent
-import json
+from pdf_cache import PdfTextCache, file_digest
+from arxiv_store import ArxivStore
+from literature_index import LiteratureIndex
+from rate_limit import ConcurrencyLimit, TokenBucket, http_status, retry_after_seconds
+from state_store import state_store_for
+from workspace import cache_path, current_workdir, set_cache_dir, workdir_path, submit_in_context
+from events import event_bus, RETRIEVAL_REQUESTED, DRAFT_SAVED, COMMENT_SAVED, SCORE_SAVED
+import httpx
+from http_clients import http_clients
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import multiprocessing
+import time
+
+# 工作流共享状态（检索请求、评分等）按当前任务的 workdir 区分
+def shared_state():
+    return state_store_for(current_workdir())
+
 
 def save_retrieval_request(enabled: bool, input_text: str) -> str:
     """
-    Write the Literature Retrieval (LitRetr) configuration into 'workdir/config.json'.
-    Example content:
+    Save the Literature Retrieval (LitRetr) request in the shared state store.
+    Stored value:
     {
-        "LitRetr": {
-            "enabled": true,
-            "input": "quantum computing review papers 2024"
-        }
+        "enabled": true,
+        "input": "quantum computing review papers 2024"
     }
     """
     try:
-        save_dir = "workdir"
-        os.makedirs(save_dir, exist_ok=True)
-        filepath = os.path.join(save_dir, "config.json")
-
-        config_data = {
-            "LitRetr": {
-                "enabled": enabled,
-                "input": input_text
-            }
-        }
+        state = shared_state()
+        state.update("LitRetr", enabled=enabled, input=input_text)
 
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(config_data, f, ensure_ascii=False, indent=2)
-
-        return f"Retrieval request saved successfully: {filepath}"
+        event_bus.publish(RETRIEVAL_REQUESTED, enabled=enabled, input=input_text)
+        return f"Retrieval request saved successfully: {state.path}"
     except Exception as e:
         return f"Retrieval request save failed: {e}"
 
@@ -81,88 +86,314 @@ def read_comment(filepath: str) -> str:
 
 
 # === PDF Reader Tool ===
-def read_literature(filepath: str) -> str:
+pdf_text_cache = PdfTextCache()
+
+
+def iter_pdf_pages(filepath: str, start_page: int = 1, end_page: int | None = None):
+    """
+    Lazily yield (page_number, text) for pages start_page..end_page of a PDF.
+    Pages already in the on-disk cache are served from it; the PDF is only
+    parsed when a page is missing. Raises ValueError if a page cannot be extracted.
+    """
+    doc_key = pdf_text_cache.doc_key(filepath)
+    reader = None
+
+    num_pages = pdf_text_cache.get_num_pages(doc_key)
+    if num_pages is None:
+        reader = PdfReader(filepath)
+        num_pages = len(reader.pages)
+        pdf_text_cache.set_num_pages(doc_key, num_pages)
+
+    last_page = num_pages if end_page is None else min(end_page, num_pages)
+    for page_number in range(max(start_page, 1), last_page + 1):
+        text = pdf_text_cache.get_page(doc_key, page_number)
+        if text is None:
+            if reader is None:
+                reader = PdfReader(filepath)
+            try:
+                text = reader.pages[page_number - 1].extract_text() or ""
+            except Exception:
+                raise ValueError(f"FAILED to extract text at page {page_number}.")
+            pdf_text_cache.put_page(doc_key, page_number, text)
+        yield page_number, text
+
+
+def read_literature(filepath: str, start_page: int = 1, end_page: int | None = None,
+                    max_chars: int = 50000, start_char: int = 0) -> str:
     """
     Read the papers downloaded by the literature search agent.
     Args:
         filepath: File path.
+        start_page: First page to read (1-based).
+        end_page: Last page to read (inclusive); defaults to the last page.
+        max_chars: Character budget, capped at MAX_LEN. Extraction stops once it is used up.
+        start_char: Character offset into the text of start_page, to continue
+            a page that was cut in the middle.
     Returns:
-        Extracted text (up to MAX_LEN characters) or an error message.
+        Extracted text (up to max_chars characters) or an error message.
     """
     MAX_LEN = 50000
+    # 参数来自模型，可能为 null 或字符串：校验失败时返回错误信息而不是抛出异常
+    try:
+        max_chars = max(0, min(MAX_LEN if max_chars is None else int(max_chars), MAX_LEN))
+        start_page = max(1, 1 if start_page is None else int(start_page))
+        end_page = None if end_page is None else int(end_page)
+        start_char = max(0, 0 if start_char is None else int(start_char))
+    except (TypeError, ValueError) as e:
+        return f"Invalid arguments for read_literature: {e}"
 
     if not os.path.exists(filepath):
         return f"File not found: {filepath}"
 
-    pdf_text = ""
+    parts = []
+    used = 0
     try:
-        reader = PdfReader(filepath)
-        for page_number, page in enumerate(reader.pages, start=1):
-            try:
-                text = page.extract_text() or ""
-            except Exception:
-                return f"FAILED to extract text at page {page_number}."
-            pdf_text += f"--- Page {page_number} ---\n{text}\n"
-
-        return pdf_text[:MAX_LEN]
+        for page_number, text in iter_pdf_pages(filepath, start_page, end_page):
+            # 只有第一页从 start_char 处开始
+            offset = start_char if page_number == start_page else 0
+            header = f"--- Page {page_number} ---\n" if not offset else f"--- Page {page_number} (from character {offset}) ---\n"
+            page_text = f"{header}{text[offset:]}\n"
+            if used + len(page_text) > max_chars:
+                # 记录本页已经返回到的字符位置，提示从该处继续，而不是从页首重读
+                shown = offset + max(0, max_chars - used - len(header))
+                if page_number == start_page and shown == offset:
+                    # 预算连页眉都放不下：同样的参数再调用也不会有进展
+                    return (f"max_chars={max_chars} is too small to return any text of page {page_number}. "
+                            f"Call read_literature again with max_chars of at least {len(header) + 1}.")
+                parts.append(page_text[:max_chars - used])
+                parts.append(
+                    f"\n[Truncated in page {page_number} at character {shown}. "
+                    f"Call read_literature with start_page={page_number} and start_char={shown} to continue.]"
+                )
+                break
+            parts.append(page_text)
+            used += len(page_text)
+    except ValueError as e:
+        return str(e)
     except Exception as e:
         return f"PDF reading failed: {e}"
 
+    print(f"PDF文本缓存：{filepath} (hits={pdf_text_cache.hits}, misses={pdf_text_cache.misses})")
+    return "".join(parts)
 
-# === Scoring Tool ===
-def save_score(score: float) -> str:
+
+# 批量读取时的进程数与整批超时（秒）的默认值，超时可通过 pdf_reader_pool.configure() 修改
+READ_WORKERS = min(8, os.cpu_count() or 1)
+PDF_READ_TIMEOUT = 120.0
+
+
+class _PdfReaderPool:
     """
-    Update score
+    Worker processes shared by all read_literatures calls, started lazily with
+    the "spawn" method: a forked child of this multithreaded process could
+    inherit a lock (e.g. of pdf_text_cache or a SQLite connection) in the
+    locked state. A call that times out retires the pool; it is terminated,
+    killing the workers still parsing, once no other call is using it, and
+    the next call starts a fresh one. `timeout` is the default time limit of
+    one read_literatures batch.
     """
-    try:
-        project_root = os.path.dirname(os.path.abspath(__file__))
 
-        workdir = os.path.join(project_root, "workdir")
-        os.makedirs(workdir, exist_ok=True)
+    def __init__(self, workers: int, timeout: float = PDF_READ_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._pool = None
+        self._users: dict = {}
+        self._retired = set()
+        self._lock = threading.Lock()
 
-        filepath = os.path.join(workdir, "config.json")
+    def configure(self, timeout: float | None = None) -> None:
+        if timeout is not None:
+            self.timeout = timeout
 
+    def acquire(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn 出的进程重新导入模块，需要传入当前配置的缓存目录
+                self._pool = multiprocessing.get_context("spawn").Pool(
+                    self.workers, initializer=set_cache_dir, initargs=(cache_path(),)
+                )
+                self._users[self._pool] = 0
+            self._users[self._pool] += 1
+            return self._pool
 
-        # 如果 config.json 不存在，则创建一个默认结构
-        if not os.path.exists(filepath):
-            config = {
-                "LitRetr": {
-                    "enabled": False,
-                    "input": ""
-                },
-                "Professor": {
-                    "score": score
-                }
-            }
-        else:
-            # 读取原文件
-            with open(filepath, "r", encoding="utf-8") as f:
+    def release(self, pool, hung: bool = False) -> None:
+        with self._lock:
+            self._users[pool] -= 1
+            if hung:
+                self._retired.add(pool)
+                if pool is self._pool:
+                    self._pool = None
+            if pool in self._retired and self._users[pool] == 0:
+                pool.terminate()
+                self._retired.discard(pool)
+                del self._users[pool]
+
+    def close(self) -> None:
+        with self._lock:
+            for pool in list(self._users):
+                pool.terminate()
+            self._pool = None
+            self._users.clear()
+            self._retired.clear()
+
+
+pdf_reader_pool = _PdfReaderPool(READ_WORKERS)
+atexit.register(pdf_reader_pool.close)
+
+
+def read_literatures(filepaths: list[str], max_chars_per_file: int = 20000,
+                     max_workers: int | None = None, timeout: float | None = None) -> str:
+    """
+    Read several papers at once, extracting them in parallel worker processes.
+    Args:
+        filepaths: PDF file paths.
+        max_chars_per_file: Character budget for each paper.
+        max_workers: 1 reads the files in this process; otherwise the shared
+            pool of READ_WORKERS processes is used.
+        timeout: Seconds for the whole batch (default pdf_reader_pool.timeout); files not
+            finished by then are reported as timed out and their workers killed.
+    Returns:
+        The extracted text of every file, in input order, each under its own header.
+    """
+    # 模型有时只传一个路径字符串，按单元素列表处理，而不是逐字符读取
+    if isinstance(filepaths, str):
+        filepaths = [filepaths]
+    timeout = pdf_reader_pool.timeout if timeout is None else timeout
+    max_workers = max(1, min(max_workers or READ_WORKERS, len(filepaths) or 1))
+
+    if max_workers == 1:
+        results = [read_literature(fp, max_chars=max_chars_per_file) for fp in filepaths]
+    else:
+        pool = pdf_reader_pool.acquire()
+        hung = False
+        try:
+            pending = [
+                pool.apply_async(read_literature, (fp,), {"max_chars": max_chars_per_file})
+                for fp in filepaths
+            ]
+            # 整批共用一个截止时间，后面的文件不会因为排在后面而多等
+            deadline = time.monotonic() + timeout
+            results = []
+            for fp, result in zip(filepaths, pending):
                 try:
-                    config = json.load(f)
-                except json.JSONDecodeError:
-                    # 如果损坏，重建
-                    config = {
-                        "LitRetr": {
-                            "enabled": False,
-                            "input": ""
-                        },
-                        "Professor": {
-                            "score": score
-                        }
-                    }
+                    results.append(result.get(timeout=max(0.0, deadline - time.monotonic())))
+                except multiprocessing.TimeoutError:
+                    hung = True
+                    results.append(f"PDF reading timed out after {timeout}s: {fp}")
+                except Exception as e:
+                    results.append(f"PDF reading failed: {e}")
+        finally:
+            pdf_reader_pool.release(pool, hung=hung)
 
-            # 确保字段存在
-            if "Professor" not in config:
-                config["Professor"] = {}
+    return "\n\n".join(
+        f"=== {fp} ===\n{text}" for fp, text in zip(filepaths, results)
+    )
 
-            # 更新评分
-            config["Professor"]["score"] = score
 
-        # 写回 JSON
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+# === Passage Retrieval Tool ===
+# 每个任务的 workdir 有自己的段落索引（论文集合不同）
+_literature_indexes: dict[str, LiteratureIndex] = {}
+_literature_indexes_lock = threading.Lock()
+
+
+def literature_index_for(workdir: str) -> LiteratureIndex:
+    index_dir = os.path.abspath(os.path.join(workdir, ".cache", "literature_index"))
+    with _literature_indexes_lock:
+        if index_dir not in _literature_indexes:
+            _literature_indexes[index_dir] = LiteratureIndex(
+                page_reader=iter_pdf_pages, key_func=pdf_text_cache.doc_key, index_dir=index_dir
+            )
+        return _literature_indexes[index_dir]
+
 
-        return f"Score {score} saved successfully to {filepath}"
+def search_literature(query: str, k: int = 5) -> str:
+    """
+    Search all downloaded papers for the passages most relevant to a query.
+    Args:
+        query: Question or keywords.
+        k: Number of passages to return.
+    Returns:
+        The top-k passages, each with a [file, page] citation, or a message if nothing matched.
+    """
+    retrieve_dir = workdir_path("retrieve_result")
+    paths = []
+    if os.path.isdir(retrieve_dir):
+        paths = sorted(
+            os.path.join(retrieve_dir, f) for f in os.listdir(retrieve_dir) if f.lower().endswith(".pdf")
+        )
+
+    literature_index = literature_index_for(current_workdir())
+    try:
+        indexed = literature_index.refresh(paths)
+        if indexed:
+            print(f"文献索引已更新：{indexed} 篇")
+        hits = literature_index.search(query, k)
+    except Exception as e:
+        return f"Literature search failed: {e}"
+
+    if not hits:
+        return f"No relevant passages found for: {query}"
+
+    return "\n\n".join(
+        f"[{i}] {os.path.basename(hit['path'])}, page {hit['page']} ({hit['path']})\n{hit['text']}"
+        for i, hit in enumerate(hits, start=1)
+    )
+
+
+# === Paper Digest Tool ===
+def read_digests() -> str:
+    """
+    Read the structured digests (method, dataset, results, limitations) of all
+    downloaded papers, produced by the summarization stage after retrieval.
+    Returns:
+        The combined digests in Markdown, or a message if none exist yet.
+    """
+    digest_path = workdir_path("digests", "digests.md")
+    if not os.path.exists(digest_path):
+        return "No paper digests available yet."
+
+    try:
+        with open(digest_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except Exception as e:
+        return f"Digest reading failed: {e}"
+
+
+# === Workdir Listing Tool ===
+LISTABLE_SUBDIRS = ("retrieve_result", "reviews", "comments", "requirements", "digests")
+
+
+def list_files(subdir: str) -> str:
+    """
+    List every file in a workdir sub-directory; the environment status only
+    shows the most recent ones.
+    Args:
+        subdir: One of LISTABLE_SUBDIRS.
+    Returns:
+        One full path per line, or a message if the directory is empty.
+    """
+    if subdir not in LISTABLE_SUBDIRS:
+        return f"Unknown directory: {subdir}. Choose one of: {', '.join(LISTABLE_SUBDIRS)}"
+    path = workdir_path(subdir)
+    if not os.path.isdir(path):
+        return f"No files in {path}"
+    names = sorted(e.name for e in os.scandir(path) if e.is_file())
+    if not names:
+        return f"No files in {path}"
+    return "\n".join(os.path.join(path, name) for name in names)
+
+
+# === Scoring Tool ===
+def save_score(score: float) -> str:
+    """
+    Update score
+    """
+    try:
+        state = shared_state()
+        state.update("Professor", score=score)
+
+        event_bus.publish(SCORE_SAVED, score=score)
+        return f"Score {score} saved successfully to {state.path}"
 
     except Exception as e:
         return f"Score saving failed: {e}"
@@ -174,13 +405,14 @@ def save_review(content: str, version: int) -> str:
     Save the review paper as a Markdown (.md) file in workdir/comments.
     """
     try:
-        save_dir = os.path.join("workdir", "reviews")
+        save_dir = workdir_path("reviews")
         os.makedirs(save_dir, exist_ok=True)
         filepath = os.path.join(save_dir, f"review(version{version}).md")
 
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(content.strip() + "\n")
 
+        event_bus.publish(DRAFT_SAVED, path=filepath, version=version)
         return f"Markdown file saved successfully: {filepath}"
     except Exception as e:
         return f"Markdown save failed: {e}"
@@ -191,22 +423,43 @@ def save_comment(content: str, version: int) -> str:
     Save comments as a Markdown (.md) file.
     """
     try:
-        save_dir = os.path.join("workdir", "comments")
+        save_dir = workdir_path("comments")
         os.makedirs(save_dir, exist_ok=True)
         filepath = os.path.join(save_dir, f"Comment(version{version}).md")
 
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(content.strip() + "\n")
 
+        event_bus.publish(COMMENT_SAVED, path=filepath, version=version)
         return f"Comment saved successfully: {filepath}"
     except Exception as e:
         return f"Comment save failed: {e}"
 
 
 # === Main ArxivSearch Tool Class ===
+# 所有 arXiv 请求（检索与下载）共用的限速器，默认每 2 秒一个请求
+ARXIV_RATE = 0.5
+arxiv_limiter = TokenBucket(rate=ARXIV_RATE, capacity=1)
+# 全进程同时进行的 arXiv 请求数上限（批量模式下由各任务共享），None 表示不限制
+arxiv_slots = ConcurrencyLimit()
+
+# 触发限速器退避的 HTTP 状态码
+THROTTLE_STATUSES = (429, 503)
+
+
+def _arxiv_backoff(error: Exception) -> None:
+    if http_status(error) in THROTTLE_STATUSES:
+        delay = arxiv_limiter.penalize(retry_after_seconds(error))
+        print(f"arXiv 限流（HTTP {http_status(error)}），{delay:.1f} 秒后重试")
+
+
 class ArxivSearch:
-    def __init__(self):
-        self.sch_engine = arxiv.Client()
+    def __init__(self, store: ArxivStore | None = None, local_first: bool = True):
+        # 节流与重试只由 arxiv_limiter / _arxiv_backoff 负责，关闭库内置的等待与重试
+        self.sch_engine = arxiv.Client(delay_seconds=0, num_retries=0)
+        # 本地元数据库：重复或相近的查询直接从本地返回
+        self.store = store or ArxivStore()
+        self.local_first = local_first
 
     def _process_query(self, query: str) -> str:
         MAX_QUERY_LENGTH = 300
@@ -224,61 +477,326 @@ class ArxivSearch:
                 break
         return ' '.join(processed_query)
 
+    @staticmethod
+    def _format_paper(record: dict) -> str:
+        return (
+            f"# {record['title']}\n\n"
+            f"**Publication Date:** {record['published']}\n\n"
+            f"**arXiv ID:** {record['paper_id']}\n\n"
+            f"**Summary:**\n{record['summary']}\n\n---\n"
+        )
+
     def find_papers_by_str(self, query: str, N: int = 5) -> str:
         processed_query = self._process_query(query)
+
+        records = self.store.lookup(processed_query, N, use_index=self.local_first)
+        if records is not None:
+            print(f"arXiv 本地缓存命中：{processed_query}")
+            return "\n".join(self._format_paper(r) for r in records)
+
         max_retries = 3
         retry_count = 0
 
         while retry_count < max_retries:
             try:
-                search = arxiv.Search(
-                    query="abs:" + processed_query,
-                    max_results=N,
-                    sort_by=arxiv.SortCriterion.Relevance)
-
-                paper_summaries = []
-                for r in self.sch_engine.results(search):
-                    paperid = r.pdf_url.split("/")[-1]
-                    pubdate = str(r.published).split(" ")[0]
-                    paper_sum = (
-                        f"# {r.title}\n\n"
-                        f"**Publication Date:** {pubdate}\n\n"
-                        f"**arXiv ID:** {paperid}\n\n"
-                        f"**Summary:**\n{r.summary}\n\n---\n"
-                    )
-                    paper_summaries.append(paper_sum)
-
-                time.sleep(2.0)
-                return "\n".join(paper_summaries)
+                with arxiv_slots:
+                    arxiv_limiter.acquire()
+                    search = arxiv.Search(
+                        query="abs:" + processed_query,
+                        max_results=N,
+                        sort_by=arxiv.SortCriterion.Relevance)
 
-            except Exception:
+                    records = []
+                    for r in self.sch_engine.results(search):
+                        records.append({
+                            "paper_id": r.pdf_url.split("/")[-1],
+                            "title": r.title,
+                            "summary": r.summary,
+                            "published": str(r.published).split(" ")[0],
+                            "pdf_url": r.pdf_url,
+                        })
+                self.store.save_results(processed_query, N, records)
+
+                arxiv_limiter.reward()
+                return "\n".join(self._format_paper(r) for r in records)
+
+            except Exception as e:
                 retry_count += 1
-                if retry_count < max_retries:
-                    time.sleep(2 * retry_count)
-                    continue
+                _arxiv_backoff(e)
+
+        # arXiv 不可用时退回本地全文索引，不论记录新旧
+        records = self.store.search_index(processed_query, N)
+        if records:
+            print(f"arXiv 查询失败，使用本地缓存的记录：{processed_query}")
+            return "\n".join(self._format_paper(r) for r in records)
         return None
 
-    def retrieve_full_paper(self, paper_id: str) -> str:
-        try:
-            paper = next(arxiv.Client().results(arxiv.Search(id_list=[paper_id])))
-            filepath = os.path.join("workdir", "retrieve_result", f"arxiv_{paper_id}.pdf")
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    def _pdf_urls(self, paper_ids: list[str]) -> dict[str, str]:
+        """
+        Resolve PDF URLs for several IDs. Known IDs come from the local store;
+        the rest are resolved with a single arxiv.Search(id_list=...) request.
+        """
+        urls = {}
+        missing = []
+        for paper_id in paper_ids:
+            record = self.store.get(paper_id)
+            if record and record.get("pdf_url"):
+                urls[paper_id] = record["pdf_url"]
+            else:
+                missing.append(paper_id)
+        if not missing:
+            return urls
+
+        with arxiv_slots:
+            arxiv_limiter.acquire()
+            search = arxiv.Search(id_list=missing, max_results=len(missing))
+            papers = list(self.sch_engine.results(search))
+
+        records = []
+        for paper in papers:
+            short_id = paper.get_short_id()
+            # 请求的 ID 可能不带版本号（2401.12345 vs 2401.12345v2）
+            for paper_id in missing:
+                if paper_id in urls:
+                    continue
+                if paper_id == short_id or _strip_version(paper_id) == _strip_version(short_id):
+                    urls[paper_id] = paper.pdf_url
+                    records.append({
+                        "paper_id": paper_id,
+                        "title": paper.title,
+                        "summary": paper.summary,
+                        "published": str(paper.published).split(" ")[0],
+                        "pdf_url": paper.pdf_url,
+                    })
+        self.store.save_papers(records)
+        return urls
 
-            ctx = ssl.create_default_context(cafile=certifi.where())
-            with urllib.request.urlopen(paper.pdf_url, context=ctx) as response, open(filepath, "wb") as out_file:
-                out_file.write(response.read())
+    def _is_downloaded(self, paper_id: str, filepath: str) -> bool:
+        """
+        Check an existing PDF against the size and hash recorded at download
+        time; files without a record only need a PDF header and trailer.
+        """
+        if not os.path.isfile(filepath):
+            return False
+        record = self.store.get_download(paper_id)
+        if record:
+            return (os.path.getsize(filepath) == record["size"]
+                    and file_digest(filepath) == record["sha256"])
+        return _looks_like_pdf(filepath)
 
-            time.sleep(2.0)
+    @staticmethod
+    def _paper_path(paper_id: str) -> str:
+        return workdir_path("retrieve_result", f"arxiv_{paper_id}.pdf")
+
+    @staticmethod
+    def _cached_paper_path(paper_id: str) -> str:
+        # 所有任务共享的论文缓存，各任务的 retrieve_result 中只放硬链接（或副本）
+        return cache_path("papers", f"arxiv_{paper_id}.pdf")
+
+    def _from_cache(self, paper_id: str) -> str | None:
+        """
+        Return the paper's path in the current workdir if it is there already or
+        can be linked from the shared paper cache; None if it must be downloaded.
+        """
+        filepath = self._paper_path(paper_id)
+        if self._is_downloaded(paper_id, filepath):
+            return filepath
+        cached_path = self._cached_paper_path(paper_id)
+        if not self._is_downloaded(paper_id, cached_path):
+            return None
+        _link_or_copy(cached_path, filepath)
+        return filepath
+
+    def _download(self, paper_id: str, pdf_url: str) -> str:
+        # 同一篇论文同时只由一个任务下载，其余任务等待后直接使用缓存
+        with _download_lock(paper_id):
+            filepath = self._from_cache(paper_id)
+            if filepath is not None:
+                return filepath
+
+            cached_path = self._cached_paper_path(paper_id)
+            os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+            part_path = cache_path("downloads", f"arxiv_{paper_id}.pdf.part")
+            _download_pdf(pdf_url, part_path, cached_path)
+
+            self.store.record_download(paper_id, cached_path, os.path.getsize(cached_path), file_digest(cached_path))
+            arxiv_limiter.reward()
+
+            filepath = self._paper_path(paper_id)
+            _link_or_copy(cached_path, filepath)
             return filepath
+
+    def retrieve_full_paper(self, paper_id: str) -> str:
+        filepath = self._from_cache(paper_id)
+        if filepath is not None:
+            print(f"论文已存在，跳过下载：{filepath}")
+            return filepath
+
+        try:
+            pdf_url = self._pdf_urls([paper_id]).get(paper_id)
+            if pdf_url is None:
+                return f"DOWNLOAD FAILED: arXiv ID not found: {paper_id}"
+            return self._download(paper_id, pdf_url)
         except Exception as e:
+            _arxiv_backoff(e)
             return f"DOWNLOAD FAILED: {e}"
 
+    def retrieve_full_papers(self, paper_ids: list[str], max_workers: int | None = None) -> str:
+        """
+        Download several papers at once: metadata for all IDs is resolved in one
+        request, then PDFs are downloaded concurrently (at most max_workers at a
+        time, default DOWNLOAD_CONCURRENCY), still paced by the shared arXiv limiter.
+        Returns one line per ID with its local path or error.
+        """
+        # 模型有时只传一个 ID 字符串，按单元素列表处理，而不是逐字符下载
+        if isinstance(paper_ids, str):
+            paper_ids = [paper_ids]
+        paper_ids = list(dict.fromkeys(paper_ids))
+        results = {}
+        pending = []
+        for paper_id in paper_ids:
+            filepath = self._from_cache(paper_id)
+            if filepath is not None:
+                results[paper_id] = filepath
+            else:
+                pending.append(paper_id)
+
+        urls = {}
+        if pending:
+            try:
+                urls = self._pdf_urls(pending)
+            except Exception as e:
+                _arxiv_backoff(e)
+                for paper_id in pending:
+                    results[paper_id] = f"DOWNLOAD FAILED: {e}"
+                pending = []
+
+        def download(paper_id):
+            try:
+                return self._download(paper_id, urls[paper_id])
+            except Exception as e:
+                _arxiv_backoff(e)
+                return f"DOWNLOAD FAILED: {e}"
+
+        for paper_id in pending:
+            if paper_id not in urls:
+                results[paper_id] = f"DOWNLOAD FAILED: arXiv ID not found: {paper_id}"
+        to_download = [paper_id for paper_id in pending if paper_id in urls]
+        if to_download:
+            with ThreadPoolExecutor(max_workers=max_workers or DOWNLOAD_CONCURRENCY) as pool:
+                futures = [submit_in_context(pool, download, paper_id) for paper_id in to_download]
+                for paper_id, future in zip(to_download, futures):
+                    results[paper_id] = future.result()
+
+        return "\n".join(f"- {paper_id}: {results[paper_id]}" for paper_id in paper_ids)
+
+
+# === PDF Download Helpers ===
+# 所有下载复用 http_clients 中带 keep-alive 连接池的客户端
+DOWNLOAD_CHUNK = 64 * 1024
+DOWNLOAD_RETRIES = 3
+# 批量下载时的最大并发连接数（总速率仍受 arxiv_limiter 限制）
+DOWNLOAD_CONCURRENCY = 3
+
+_download_locks: dict[str, threading.Lock] = {}
+_download_locks_guard = threading.Lock()
+
+
+def _download_lock(paper_id: str) -> threading.Lock:
+    with _download_locks_guard:
+        return _download_locks.setdefault(paper_id, threading.Lock())
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """Atomically place `src` at `dst`, as a hard link when the filesystem allows it."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp_path = dst + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def _strip_version(paper_id: str) -> str:
+    return re.sub(r"v\d+$", "", paper_id)
+
+
+def _looks_like_pdf(filepath: str) -> bool:
+    """
+    Cheap structural check: PDF header at the start and %%EOF near the end.
+    """
+    size = os.path.getsize(filepath)
+    if size < 16:
+        return False
+    with open(filepath, "rb") as f:
+        if not f.read(5).startswith(b"%PDF-"):
+            return False
+        f.seek(max(0, size - 1024))
+        return b"%%EOF" in f.read()
+
+
+def _download_pdf(url: str, part_path: str, filepath: str) -> None:
+    """
+    Stream a PDF to `part_path` in chunks and atomically move it to `filepath`.
+    An existing part file is resumed with an HTTP Range request; if the server
+    ignores the range, the download restarts from zero.
+    """
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        try:
+            with arxiv_slots:
+                arxiv_limiter.acquire()
+                with http_clients.download_client().stream("GET", url, headers=headers) as response:
+                    response.raise_for_status()
+                    if offset and response.status_code != 206:
+                        offset = 0  # 服务器不支持断点续传，重新下载
+                    expected = response.headers.get("Content-Length")
+                    expected = offset + int(expected) if expected else None
+
+                    with open(part_path, "ab" if offset else "wb") as out_file:
+                        for chunk in response.iter_raw(DOWNLOAD_CHUNK):
+                            out_file.write(chunk)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 416:  # 请求范围无效：分段文件已损坏或已完整，重新下载
+                os.remove(part_path)
+                continue
+            if attempt == DOWNLOAD_RETRIES or http_status(e) not in THROTTLE_STATUSES:
+                raise
+            _arxiv_backoff(e)
+            continue
+        except (OSError, httpx.TransportError):
+            # 连接中断时保留分段文件，下一次尝试从断点继续
+            if attempt == DOWNLOAD_RETRIES:
+                raise
+            continue
+
+        if expected is not None and os.path.getsize(part_path) != expected:
+            if attempt == DOWNLOAD_RETRIES:
+                raise IOError(f"incomplete download: {os.path.getsize(part_path)}/{expected} bytes")
+            continue
+        if not _looks_like_pdf(part_path):
+            os.remove(part_path)
+            raise IOError(f"downloaded file is not a PDF: {url}")
+
+        os.replace(part_path, filepath)
+        return
+
+    raise IOError(f"download failed after {DOWNLOAD_RETRIES} attempts: {url}")
+
 
 # === Instantiate the Search Engine ===
 arxiv_toolkit = ArxivSearch()
 
 
 # === Register All Tools ===
+# parallel_safe: 该工具可以与同一轮中的其他可并行工具并发执行（只读或写入互不冲突的文件）
 ALL_TOOLS = {
     "find_papers_by_str": {
         "meta": {
@@ -296,7 +814,8 @@ ALL_TOOLS = {
                 }
             }
         },
-        "func": arxiv_toolkit.find_papers_by_str
+        "func": arxiv_toolkit.find_papers_by_str,
+        "parallel_safe": True
     },
 
     "retrieve_full_paper": {
@@ -314,7 +833,31 @@ ALL_TOOLS = {
                 }
             }
         },
-        "func": arxiv_toolkit.retrieve_full_paper
+        "func": arxiv_toolkit.retrieve_full_paper,
+        "parallel_safe": True
+    },
+
+    "retrieve_full_papers": {
+        "meta": {
+            "type": "function",
+            "function": {
+                "name": "retrieve_full_papers",
+                "description": "Download several arXiv papers by ID in one call and return the local PDF path (or error) for each ID. Prefer this over repeated retrieve_full_paper calls.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "paper_ids": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "arXiv paper IDs, e.g. ['2401.12345', '2402.00001']."
+                        }
+                    },
+                    "required": ["paper_ids"]
+                }
+            }
+        },
+        "func": arxiv_toolkit.retrieve_full_papers,
+        "parallel_safe": True
     },
 
     "read_literature": {
@@ -322,17 +865,102 @@ ALL_TOOLS = {
             "type": "function",
             "function": {
                 "name": "read_literature",
-                "description": "Extract text from a literature PDF file given its full path.",
+                "description": "Extract text from a literature PDF file given its full path. Long papers can be read in parts with start_page/end_page/max_chars.",
                 "parameters": {
                     "type": "object",
                     "properties": {
-                        "filepath": {"type": "string", "description": "Full path to the PDF file."}
+                        "filepath": {"type": "string", "description": "Full path to the PDF file."},
+                        "start_page": {"type": "integer", "description": "First page to read, 1-based (default 1). Use it to continue a truncated read."},
+                        "end_page": {"type": "integer", "description": "Last page to read, inclusive (default: last page)."},
+                        "max_chars": {"type": "integer", "description": "Maximum number of characters to return (default and maximum 50000)."},
+                        "start_char": {"type": "integer", "description": "Character offset into start_page (default 0). Use the value given in a truncation note to continue a cut page."}
                     },
                     "required": ["filepath"]
                 }
             }
         },
-        "func": read_literature
+        "func": read_literature,
+        "parallel_safe": True
+    },
+
+    "read_literatures": {
+        "meta": {
+            "type": "function",
+            "function": {
+                "name": "read_literatures",
+                "description": "Extract text from several literature PDF files in parallel. Prefer this over repeated read_literature calls when reading multiple papers.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "filepaths": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Full paths to the PDF files."
+                        },
+                        "max_chars_per_file": {"type": "integer", "description": "Maximum number of characters returned per file (default 20000)."}
+                    },
+                    "required": ["filepaths"]
+                }
+            }
+        },
+        "func": read_literatures,
+        "parallel_safe": True
+    },
+
+    "search_literature": {
+        "meta": {
+            "type": "function",
+            "function": {
+                "name": "search_literature",
+                "description": "Search all downloaded papers and return only the most relevant passages, each cited as [file, page]. Much cheaper than reading whole papers; use read_literature only when a full section is needed.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {"type": "string", "description": "Question or keywords to look for."},
+                        "k": {"type": "integer", "description": "Number of passages to return (default 5)."}
+                    },
+                    "required": ["query"]
+                }
+            }
+        },
+        "func": search_literature,
+        "parallel_safe": True
+    },
+
+    "read_digests": {
+        "meta": {
+            "type": "function",
+            "function": {
+                "name": "read_digests",
+                "description": "Read the structured digests (method, dataset, results, limitations) of all downloaded papers. Start here before searching or reading full texts.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {},
+                    "required": []
+                }
+            }
+        },
+        "func": read_digests,
+        "parallel_safe": True
+    },
+
+    "list_files": {
+        "meta": {
+            "type": "function",
+            "function": {
+                "name": "list_files",
+                "description": "List the full paths of all files in a workdir directory. Use it when the current status says some files are not listed.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "subdir": {"type": "string", "enum": list(LISTABLE_SUBDIRS), "description": "Directory to list, e.g. \"retrieve_result\" for the downloaded papers."}
+                    },
+                    "required": ["subdir"]
+                }
+            }
+        },
+        "func": list_files,
+        "parallel_safe": True
     },
 
     "save_review": {
@@ -351,7 +979,8 @@ ALL_TOOLS = {
                 }
             }
         },
-        "func": save_review
+        "func": save_review,
+        "parallel_safe": False
     },
 
     "read_review": {
@@ -369,7 +998,8 @@ ALL_TOOLS = {
                 }
             }
         },
-        "func": read_review
+        "func": read_review,
+        "parallel_safe": True
     },
 
     "save_score": {
@@ -383,14 +1013,15 @@ ALL_TOOLS = {
                 "properties": {
                 "score": {
                     "type": "number",
-                    "description": "Numeric score value to write into config.json"
+                    "description": "Numeric score value to save in the shared workflow state"
                 }
                 },
                 "required": ["score"]
             }
             }
         },
-        "func": save_score
+        "func": save_score,
+        "parallel_safe": False
         },
 
     "save_retrieval_request": {
@@ -398,7 +1029,7 @@ ALL_TOOLS = {
             "type": "function",
             "function": {
                 "name": "save_retrieval_request",
-                "description": "Save LitRetr agent configuration (enabled flag and retrieval request) into '/workdir/config.json'. "
+                "description": "Save LitRetr agent configuration (enabled flag and retrieval request) into the shared workflow state. "
                 "When there are no relevant papers available or when a new literature retrieval is needed, you should call this tool and set 'enabled' to True. You should carefully consider whether set 'enabled' to True. "
                 "You just need to wait for the LitRetr agent to complete its work.",
                 "parameters": {
@@ -417,7 +1048,8 @@ ALL_TOOLS = {
                 }
             }
         },
-        "func": save_retrieval_request
+        "func": save_retrieval_request,
+        "parallel_safe": False
     },
         "read_comment": {
         "meta": {
@@ -434,7 +1066,8 @@ ALL_TOOLS = {
                 }
             }
         },
-        "func": read_comment
+        "func": read_comment,
+        "parallel_safe": True
     },
         "save_comment": {
         "meta": {
@@ -452,7 +1085,8 @@ ALL_TOOLS = {
                 }
             }
         },
-        "func": save_comment
+        "func": save_comment,
+        "parallel_safe": False
     },
 
 
@@ -0,0 +1,54 @@
+import contextvars
+import os
+from contextlib import contextmanager
+
+# 各任务共享的缓存目录（PDF 文本、arXiv 元数据、已下载论文、论文摘要）的默认位置；
+# main.py / batch.py 通过 set_cache_dir() 改为 --cache_dir（默认在工作目录下）
+DEFAULT_CACHE_DIR = os.path.join("workdir", ".cache")
+
+_cache_dir = os.path.abspath(DEFAULT_CACHE_DIR)
+_current_workdir = contextvars.ContextVar("workdir", default="workdir")
+
+
+def set_cache_dir(path: str) -> None:
+    """
+    Set the process-wide cache root. Call it before the first tool runs:
+    caches resolve their files under it when they first open them.
+    """
+    global _cache_dir
+    _cache_dir = os.path.abspath(path)
+
+
+def cache_path(*parts: str) -> str:
+    return os.path.join(_cache_dir, *parts)
+
+
+def current_workdir() -> str:
+    """
+    Workdir of the job running in the current context. Tools resolve every
+    job-specific path (reviews, comments, retrieved papers, state) through it,
+    so several workflows can run in one process without sharing files.
+    """
+    return _current_workdir.get()
+
+
+def workdir_path(*parts: str) -> str:
+    return os.path.join(current_workdir(), *parts)
+
+
+@contextmanager
+def use_workdir(workdir: str):
+    """Run the enclosed code (and tasks / threads started with submit_in_context) in `workdir`."""
+    token = _current_workdir.set(workdir)
+    try:
+        yield workdir
+    finally:
+        _current_workdir.reset(token)
+
+
+def submit_in_context(pool, fn, *args, **kwargs):
+    """
+    pool.submit() that runs `fn` in a copy of the caller's context, so worker
+    threads see the same workdir as the code that submitted them.
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)